@@ -2,6 +2,7 @@
 Database utilities for the API.
 """
 import duckdb
+import json
 import os
 import pandas as pd
 from logzero import logger
@@ -88,30 +89,29 @@ def get_market_summary(symbol: Optional[str] = None) -> List[Dict[str, Any]]:
         else:
             logger.warning(f"Parquet file not found at {parquet_file}, falling back to database query")
             
-            # Fallback to database query
-            db_manager = DBManager()
-            if not db_manager.conn:
-                logger.error("Failed to connect to database")
-                return []
+            # Fallback to database query on a short-lived read-only connection, so the API
+            # never holds the write lock the pipeline and monitor need
+            db_manager = DBManager(read_only=True)
+            try:
+                # Ensure the market_summary_view exists
+                if not db_manager.ensure_market_summary_view():
+                    return []
                 
-            # Ensure the market_summary_view exists
-            db_manager._init_market_summary_view()
+                # Build query
+                query = "SELECT * FROM market_summary_view"
+                params = []
+                if symbol:
+                    symbol_param = f"%{symbol}%"
+                    query += " WHERE symbol LIKE ? OR name LIKE ?"
+                    params = [symbol_param, symbol_param]
+                    
+                # Execute query
+                results = db_manager.fetch_arrow(query, params)
+            finally:
+                db_manager.close()
             
-            # Build query
-            query = "SELECT * FROM market_summary_view"
-            if symbol:
-                symbol_param = f"%{symbol}%"
-                query += f" WHERE symbol LIKE '{symbol_param}' OR name LIKE '{symbol_param}'"
-                
-            # Execute query
-            results = db_manager.conn.execute(query).fetchdf()
-            db_manager.close()
-            
-            if results.empty:
-                return []
-                
-            # Convert to list of dictionaries
-            return results.to_dict(orient='records')
+            # Convert the Arrow table straight to a list of dicts, skipping pandas
+            return results.to_pylist()
             
     except Exception as e:
         logger.error(f"Error retrieving market summary: {str(e)}")
@@ -199,10 +199,43 @@ def get_market_summary_for_symbol(symbol: str) -> Dict[str, Any]:
         logger.error(f"Error getting market summary for symbol {symbol}: {str(e)}")
         return {}
 
+MARKET_SUMMARY_META_FILE = os.path.join(".cache", "market_summary.meta.json")
+
+def _load_market_summary_meta() -> Dict[str, Any]:
+    """
+    Load the validation metadata cached for the market summary Parquet file.
+    
+    Returns:
+        Dict with mtime_ns, size and record_count, or empty dict if unavailable
+    """
+    try:
+        with open(MARKET_SUMMARY_META_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_market_summary_meta(meta: Dict[str, Any]) -> None:
+    """
+    Persist validation metadata atomically (write to a temp file, then rename).
+    
+    Args:
+        meta: Metadata to store
+    """
+    try:
+        os.makedirs(os.path.dirname(MARKET_SUMMARY_META_FILE), exist_ok=True)
+        tmp_file = f"{MARKET_SUMMARY_META_FILE}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_file, MARKET_SUMMARY_META_FILE)
+    except OSError as e:
+        logger.warning(f"Could not write market summary metadata cache: {str(e)}")
+
 def ensure_market_summary_view_exists():
     """
     Check if the market summary Parquet file exists.
     This replaces the previous database view check with a Parquet file check.
+    The file is only re-read when its mtime or size changed since the last
+    successful validation.
     
     Returns:
         bool: True if the file exists, False otherwise
@@ -213,12 +246,23 @@ def ensure_market_summary_view_exists():
         logger.error(f"Market summary Parquet file not found: {parquet_file}")
         logger.error("Please run the market data pipeline to generate the Parquet file")
         return False
+    
+    stat = os.stat(parquet_file)
+    meta = _load_market_summary_meta()
+    if meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('size') == stat.st_size:
+        logger.info(f"✅ Market summary Parquet file unchanged ({meta.get('record_count')} records)")
+        return True
         
     try:
         # Attempt to read the file to verify it's valid
         df = pd.read_parquet(parquet_file)
         record_count = len(df)
         logger.info(f"✅ Market summary Parquet file verified with {record_count} records")
+        _save_market_summary_meta({
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'record_count': record_count
+        })
         return True
     except Exception as e:
         logger.error(f"Failed to read market summary Parquet file: {str(e)}")
@@ -236,15 +280,15 @@ def get_technical_indicators_summary(token=None, symbol=None) -> List[Dict[str,
         List of technical indicators summary records
     """
     try:
-        db_manager = DBManager()
-        results = db_manager.get_technical_indicators_summary(token=token, symbol=symbol)
-        db_manager.close()
+        # Read-only and closed again after the request, see get_market_summary()
+        db_manager = DBManager(read_only=True)
+        try:
+            results = db_manager.get_technical_indicators_summary(token=token, symbol=symbol, as_arrow=True)
+        finally:
+            db_manager.close()
         
-        if results.empty:
-            return []
-            
-        # Convert DataFrame to list of dicts
-        return results.to_dict(orient='records')
+        # Convert the Arrow table straight to a list of dicts, skipping pandas
+        return results.to_pylist()
         
     except Exception as e:
         logger.error(f"Error retrieving technical indicators summary: {str(e)}")
@@ -9,8 +9,11 @@ import pandas as pd
 
 router = APIRouter(prefix="/api", tags=["market"])
 
+# Routes are plain functions: their DuckDB and Parquet reads block, so FastAPI runs
+# them in its threadpool instead of on the event loop
+
 @router.get("/market-summary", response_model=List[MarketSummary], summary="Get market summary data")
-async def get_market_summary_route():
+def get_market_summary_route():
     """
     Get market summary data for all available symbols.
     
@@ -22,7 +25,7 @@ async def get_market_summary_route():
     return data
 
 @router.get("/market-summary/{symbol}", response_model=List[MarketSummary], summary="Get market summary for a symbol")
-async def get_market_summary_by_symbol(symbol: str):
+def get_market_summary_by_symbol(symbol: str):
     """
     Get market summary data for a specific symbol.
     
@@ -38,7 +41,7 @@ async def get_market_summary_by_symbol(symbol: str):
     return data
 
 @router.get("/market-summary/filter", response_model=List[MarketSummary], summary="Filter market summary data")
-async def filter_market_summary_route(
+def filter_market_summary_route(
     min_ltp: Optional[float] = Query(None, description="Minimum Last Traded Price"),
     max_ltp: Optional[float] = Query(None, description="Maximum Last Traded Price"),
     min_percent_change: Optional[float] = Query(None, description="Minimum percentage change"),
@@ -67,7 +70,7 @@ async def filter_market_summary_route(
     return data
 
 @router.get("/technical-indicators", response_model=List[TechnicalIndicatorsSummary], summary="Get technical indicators data")
-async def get_technical_indicators_route():
+def get_technical_indicators_route():
     """
     Get technical indicators summary data for all available symbols.
     
@@ -80,7 +83,7 @@ async def get_technical_indicators_route():
     return data
 
 @router.get("/technical-indicators/{symbol}", response_model=List[TechnicalIndicatorsSummary], summary="Get technical indicators for a symbol")
-async def get_technical_indicators_by_symbol(symbol: str):
+def get_technical_indicators_by_symbol(symbol: str):
     """
     Get technical indicators summary data for a specific symbol.
     
@@ -96,7 +99,7 @@ async def get_technical_indicators_by_symbol(symbol: str):
     return data
 
 @router.get("/market-summary/technical-filter", response_model=List[MarketSummary], summary="Filter market data by technical indicators")
-async def filter_market_by_technicals(
+def filter_market_by_technicals(
     sma_position: Optional[str] = Query(None, description="Filter by position relative to SMA200 (ABOVE_SMA200, BELOW_SMA200, AT_SMA200)"),
     crossover_status: Optional[str] = Query(None, description="Filter by MA crossover status (BULLISH_CROSSOVER, BEARISH_CROSSOVER, NEUTRAL)"),
     min_rsi: Optional[float] = Query(None, description="Minimum RSI-14 value (0-100)"),
@@ -13,29 +13,7 @@ from src.token_manager import TokenManager
 from src.db_manager import DBManager
 from src.equity_market_data_manager import EquityMarketDataManager
 from src.realtime_market_data_manager import RealtimeMarketDataManager
-
-# Fix logging for Windows consoles
-def setup_console_logging():
-    """Configure the root logger to prevent Unicode errors in Windows console."""
-    # Replace Unicode characters with ASCII equivalents for console output
-    class AsciiFormatter(logging.Formatter):
-        def format(self, record):
-            msg = super().format(record)
-            # Replace Unicode characters with ASCII equivalents
-            return (msg.replace('✅', '[OK]')
-                      .replace('❌', '[ERROR]')
-                      .replace('✓', '[Y]')
-                      .replace('✗', '[N]'))
-    
-    # Configure the console handler with the ASCII formatter
-    console = logging.StreamHandler()
-    console.setFormatter(AsciiFormatter('%(levelname)s %(message)s'))
-    logging.getLogger().addHandler(console)
-    
-    # Remove existing handlers from the root logger
-    for handler in logging.getLogger().handlers[:]:
-        if isinstance(handler, logging.StreamHandler) and handler != console:
-            logging.getLogger().removeHandler(handler)
+from scripts._monitor_common import setup_console_logging
 
 def test_connection():
     """Test the connection to Angel One API."""
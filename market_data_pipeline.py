@@ -24,14 +24,13 @@ Options:
     --verbose           Enable verbose output
 """
 
-import os
 import sys
 import time
 import argparse
 import signal
 from datetime import datetime, time as dt_time
 import logging
-from logzero import logger, logfile
+from logzero import logger
 
 # Import required modules
 from src.token_manager import TokenManager
@@ -41,20 +40,23 @@ from src.angel_one_connector import AngelOneConnector
 from src.realtime_market_data_manager import RealtimeMarketDataManager
 from src.technical_indicator_manager import TechnicalIndicatorManager
 from src.config_manager import config
-from scripts.realtime_market_monitor import setup_console_logging, signal_handler
-
-# Global flag for running state
-running = True
+from scripts import _monitor_common
+from scripts._monitor_common import (
+    setup_console_logging, shutdown_event, install_signal_handler, is_market_hours
+)
 
 def setup_logging():
-    """Setup logging for the pipeline."""
-    os.makedirs("logs", exist_ok=True)
-    log_file = os.path.join("logs", f"market_data_pipeline_{datetime.now().strftime('%Y%m%d')}.log")
-    logfile(log_file, maxBytes=1e6, backupCount=5)  # 1MB max size, 5 backup files
-    logger.info(f"Logging to {log_file}")
+    """
+    Setup logging for the pipeline.
+    
+    Returns:
+        QueueListener: Running listener, stop it on shutdown to flush pending records
+    """
+    listener = _monitor_common.setup_logging("logs", "market_data_pipeline", backup_count=5)
     
     # Set logger level to INFO (or DEBUG for verbose)
     logger.setLevel(logging.INFO)
+    return listener
 
 def refresh_tokens(hard_refresh=False):
     """
@@ -119,7 +121,7 @@ def refresh_historical_data(limit=None, interval="ONE_DAY", batch_size=5):
     
     for i in range(0, total_tokens, batch_size):
         # Check if we should exit
-        if not running:
+        if shutdown_event.is_set():
             logger.info("Stopping historical data refresh due to interrupt...")
             break
             
@@ -129,37 +131,29 @@ def refresh_historical_data(limit=None, interval="ONE_DAY", batch_size=5):
         
         logger.info(f"Processing batch {batch_num}/{total_batches} (tokens {i+1}-{batch_end} of {total_tokens})")
         
-        for _, token_row in batch_tokens.iterrows():
-            token = token_row['token']
-            name = token_row['name']
-            exchange = token_row['exch_seg']
-            
-            try:
-                # Fetch and store data for this token
-                result = manager.fetch_and_store_equity_market_data_for_token(
-                    token=token,
-                    name=name,
-                    exchange=exchange,
-                    interval=interval
-                )
-                
-                if result.get('success', False):
-                    success_count += 1
-                else:
-                    error_count += 1
-                    
-                # Small delay between API requests
-                request_delay = config.get('equity_market_data', 'rate_limiting', 'request_delay') or 0.25
-                time.sleep(request_delay)
-                
-            except Exception as e:
+        # Fetch the whole batch concurrently; request starts stay request_delay apart
+        token_rows = list(batch_tokens[['token', 'exch_seg', 'name']].itertuples(index=False, name=None))
+        responses = manager.fetch_equity_market_data_many(token_rows, interval=interval)
+        
+        fetched = {}
+        for (token, exchange, name), response in zip(token_rows, responses):
+            data = response.get('data', []) if response else []
+            if data:
+                fetched[token] = (name, data)
+            else:
                 error_count += 1
-                logger.error(f"Error processing {name} ({token}): {str(e)}")
+                logger.error(f"Failed to fetch data for {name} ({token})")
+        
+        # Store the batch with a single insert on this thread
+        if fetched:
+            stored = db_manager.store_historical_data_bulk(fetched)
+            success_count += len(stored)
+            error_count += len(fetched) - len(stored)
         
         # Delay between batches to avoid overloading the API
-        if batch_num < total_batches and running:
+        if batch_num < total_batches and not shutdown_event.is_set():
             logger.info(f"Waiting {batch_delay} seconds before next batch...")
-            time.sleep(batch_delay)
+            shutdown_event.wait(batch_delay)
     
     # Summary
     logger.info(f"Historical data refresh completed: {success_count} succeeded, {error_count} failed")
@@ -213,20 +207,6 @@ def refresh_historical_data(limit=None, interval="ONE_DAY", batch_size=5):
     
     return success_count > 0
 
-def is_market_hours():
-    """Check if current time is within market hours."""
-    now = datetime.now().time()
-    
-    # Get market hours from config
-    market_start_str = config.get('market', 'trading_hours', 'start')
-    market_end_str = config.get('market', 'trading_hours', 'end')
-    
-    # Parse market hours
-    market_start = dt_time.fromisoformat(market_start_str)
-    market_end = dt_time.fromisoformat(market_end_str)
-    
-    return market_start <= now <= market_end
-
 def wait_until_market_open():
     """Wait until the market opens if current time is before market hours."""
     if is_market_hours():
@@ -262,9 +242,10 @@ def wait_until_market_open():
     wait_increment = 30  # seconds
     waited = 0
     
-    while waited < wait_seconds and running:
+    while waited < wait_seconds:
         wait_time = min(wait_increment, wait_seconds - waited)
-        time.sleep(wait_time)
+        if shutdown_event.wait(wait_time):
+            break
         waited += wait_time
         
         remaining = wait_seconds - waited
@@ -331,13 +312,8 @@ def run_realtime_monitoring(
     # Main monitoring loop
     iterations = 0
     
-    while running:
+    while not shutdown_event.is_set():
         iterations += 1
-        
-        # Check if we should exit
-        if not running:
-            logger.info("Stopping real-time monitoring due to interrupt...")
-            break
             
         # Check if market is open
         market_open = is_market_hours()
@@ -380,13 +356,10 @@ def run_realtime_monitoring(
         else:
             logger.info(f"Iteration {iterations}: Market is closed, skipping data fetch.")
         
-        # Wait for next iteration, but check for interrupt every second
+        # Wait for next iteration, returning early on interrupt
         logger.info(f"Waiting {refresh_interval} seconds until next refresh...")
-        for _ in range(refresh_interval):
-            if not running:
-                logger.info("Stopping real-time monitoring due to interrupt...")
-                break
-            time.sleep(1)
+        if shutdown_event.wait(refresh_interval):
+            logger.info("Stopping real-time monitoring due to interrupt...")
     
     # Close database connection
     if db_manager:
@@ -395,12 +368,6 @@ def run_realtime_monitoring(
     logger.info("Real-time market monitoring stopped")
     return True
 
-def handle_signal(sig, frame):
-    """Handle interrupt signals."""
-    global running
-    logger.info("Received shutdown signal, gracefully shutting down...")
-    running = False
-
 def export_market_summary_to_parquet():
     """
     Export market summary view to a Parquet file for API consumption.
@@ -418,10 +385,28 @@ def export_market_summary_to_parquet():
         logger.error(f"Error exporting market summary to Parquet: {str(e)}")
         return False
 
+def archive_historical_data():
+    """
+    Move old historical candles to the month-partitioned Parquet archive.
+    
+    Returns:
+        bool: Success status
+    """
+    logger.info("Archiving old historical data to Parquet...")
+    try:
+        db_manager = DBManager()
+        success = db_manager.archive_historical_data()
+        db_manager.close()
+        return success
+    except Exception as e:
+        logger.error(f"Error archiving historical data: {str(e)}")
+        return False
+
 def run_pipeline(
     skip_tokens=False,
     skip_history=False,
     history_limit=None,
+    archive_history=False,
     include_equity=True,
     include_futures=True,
     include_options=True,
@@ -441,6 +426,7 @@ def run_pipeline(
         skip_tokens: Skip token refresh step
         skip_history: Skip historical data refresh step
         history_limit: Limit for historical data refresh
+        archive_history: Move old historical data to the Parquet archive after the refresh
         include_equity: Whether to include equity in real-time monitoring
         include_futures: Whether to include futures in real-time monitoring
         include_options: Whether to include options in real-time monitoring
@@ -457,65 +443,71 @@ def run_pipeline(
         bool: Success status
     """
     # Register signal handler
-    signal.signal(signal.SIGINT, handle_signal)
-    signal.signal(signal.SIGTERM, handle_signal)
-    
-    setup_logging()
-    logger.info("=" * 80)
-    logger.info(f"STARTING ANGEL ONE MARKET DATA PIPELINE AT {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    logger.info("=" * 80)
-    
-    # Step 1: Refresh tokens if needed
-    if not skip_tokens:
-        token_success = refresh_tokens(hard_refresh=False)
-        if not token_success:
-            logger.error("Token refresh failed, continuing with pipeline...")
-    else:
-        logger.info("Skipping token refresh as requested")
-    
-    # Step 2: Refresh historical data if needed
-    if not skip_history:
-        history_success = refresh_historical_data(limit=history_limit)
-        if not history_success:
-            logger.error("Historical data refresh failed, continuing with pipeline...")
-    else:
-        logger.info("Skipping historical data refresh as requested")
-    
-    # Step 3: Wait for market open if needed
-    if wait_for_market:
-        wait_until_market_open()
-    else:
-        logger.info("Skipping wait for market open as requested")
-    
-    # Step 4: Run real-time monitoring
-    if running:
-        logger.info("Beginning real-time market monitoring...")
-        monitoring_success = run_realtime_monitoring(
-            refresh_interval=refresh_interval,
-            include_equity=include_equity,
-            include_futures=include_futures,
-            include_options=include_options,
-            equity_limit=equity_limit,
-            futures_limit=futures_limit,
-            options_limit=options_limit,
-            atm_only=atm_only,
-            strike_buffer=strike_buffer,
-            exact_atm_only=exact_atm_only
-        )
-    else:
-        logger.info("Pipeline interrupted before real-time monitoring could start")
-        monitoring_success = False
-    
-    # Step 5: Export market summary to Parquet file for API consumption
-    export_success = export_market_summary_to_parquet()
-    if not export_success:
-        logger.error("Failed to export market summary to Parquet, API may not have latest data")
-    
-    logger.info("=" * 80)
-    logger.info(f"PIPELINE COMPLETED AT {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    logger.info("=" * 80)
+    install_signal_handler(signal.SIGINT, signal.SIGTERM)
     
-    return True
+    log_listener = setup_logging()
+    try:
+        logger.info("=" * 80)
+        logger.info(f"STARTING ANGEL ONE MARKET DATA PIPELINE AT {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        logger.info("=" * 80)
+        
+        # Step 1: Refresh tokens if needed
+        if not skip_tokens:
+            token_success = refresh_tokens(hard_refresh=False)
+            if not token_success:
+                logger.error("Token refresh failed, continuing with pipeline...")
+        else:
+            logger.info("Skipping token refresh as requested")
+        
+        # Step 2: Refresh historical data if needed
+        if not skip_history:
+            history_success = refresh_historical_data(limit=history_limit)
+            if not history_success:
+                logger.error("Historical data refresh failed, continuing with pipeline...")
+        else:
+            logger.info("Skipping historical data refresh as requested")
+        
+        if archive_history and not archive_historical_data():
+            logger.error("Historical data archive failed, continuing with pipeline...")
+        
+        # Step 3: Wait for market open if needed
+        if wait_for_market:
+            wait_until_market_open()
+        else:
+            logger.info("Skipping wait for market open as requested")
+        
+        # Step 4: Run real-time monitoring
+        if not shutdown_event.is_set():
+            logger.info("Beginning real-time market monitoring...")
+            monitoring_success = run_realtime_monitoring(
+                refresh_interval=refresh_interval,
+                include_equity=include_equity,
+                include_futures=include_futures,
+                include_options=include_options,
+                equity_limit=equity_limit,
+                futures_limit=futures_limit,
+                options_limit=options_limit,
+                atm_only=atm_only,
+                strike_buffer=strike_buffer,
+                exact_atm_only=exact_atm_only
+            )
+        else:
+            logger.info("Pipeline interrupted before real-time monitoring could start")
+            monitoring_success = False
+        
+        # Step 5: Export market summary to Parquet file for API consumption
+        export_success = export_market_summary_to_parquet()
+        if not export_success:
+            logger.error("Failed to export market summary to Parquet, API may not have latest data")
+        
+        logger.info("=" * 80)
+        logger.info(f"PIPELINE COMPLETED AT {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        logger.info("=" * 80)
+        
+        return True
+    finally:
+        # Flush queued log records to the log file, also when the pipeline fails
+        log_listener.stop()
 
 def main():
     """Main entry point with command-line parsing."""
@@ -527,6 +519,7 @@ def main():
     # Historical data options
     parser.add_argument("--no-history", action="store_true", help="Skip historical data refresh step")
     parser.add_argument("--history-limit", type=int, help="Limit historical data to N equity tokens")
+    parser.add_argument("--archive-history", action="store_true", help="Move old historical data to the Parquet archive")
     
     # Real-time monitoring options
     parser.add_argument("--no-wait", action="store_true", help="Don't wait for market open before starting real-time monitoring")
@@ -559,6 +552,7 @@ def main():
         skip_tokens=args.no_tokens,
         skip_history=args.no_history,
         history_limit=args.history_limit,
+        archive_history=args.archive_history,
         include_equity=not args.no_equity,
         include_futures=not args.no_futures,
         include_options=not args.no_options,
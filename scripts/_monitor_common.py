@@ -0,0 +1,100 @@
+"""
+Shared helpers for the long-running entry points
+(scripts/realtime_market_monitor.py, market_data_pipeline.py and main.py).
+"""
+
+import os
+import queue
+import signal
+import logging
+import threading
+from datetime import datetime, time as dt_time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from logzero import logger, LogFormatter
+
+from src.config_manager import config
+
+# Set by the signal handler; loops wait on it instead of polling a flag
+shutdown_event = threading.Event()
+
+# Unicode to ASCII replacements, applied in a single C-level str.translate pass
+_ASCII_TABLE = str.maketrans({
+    '✅': '[OK]',
+    '❌': '[ERROR]',
+    '✓': '[Y]',
+    '✗': '[N]',
+})
+
+# Fix logging for Windows consoles
+def setup_console_logging():
+    """Configure the root logger to prevent Unicode errors in Windows console."""
+    # Replace Unicode characters with ASCII equivalents for console output
+    class AsciiFormatter(logging.Formatter):
+        def format(self, record):
+            return super().format(record).translate(_ASCII_TABLE)
+
+    # Configure the console handler with the ASCII formatter
+    console = logging.StreamHandler()
+    console.setFormatter(AsciiFormatter('%(levelname)s %(message)s'))
+    logging.getLogger().addHandler(console)
+
+    # Remove existing handlers from the root logger
+    for handler in logging.getLogger().handlers[:]:
+        if isinstance(handler, logging.StreamHandler) and handler != console:
+            logging.getLogger().removeHandler(handler)
+
+def _signal_handler(sig, frame):
+    """Handle shutdown signals by setting the shared shutdown event."""
+    logger.info("Received shutdown signal, finishing current cycle and exiting...")
+    shutdown_event.set()
+
+def install_signal_handler(*signals):
+    """
+    Install the graceful shutdown handler.
+
+    Args:
+        signals: Signals to handle (default: SIGINT)
+    """
+    shutdown_event.clear()
+    for sig in signals or (signal.SIGINT,):
+        signal.signal(sig, _signal_handler)
+
+def is_market_hours():
+    """Check if current time is within market hours."""
+    now = datetime.now().time()
+
+    # Get market hours from config
+    market_start = dt_time.fromisoformat(config.get('market', 'trading_hours', 'start'))
+    market_end = dt_time.fromisoformat(config.get('market', 'trading_hours', 'end'))
+
+    # Check if current time is within market hours
+    return market_start <= now <= market_end
+
+def setup_logging(log_dir, name, backup_count=3):
+    """
+    Setup logging with rotation.
+
+    The rotating file handler runs on a background QueueListener thread, so log
+    calls in the monitor loop only enqueue records instead of writing to disk.
+
+    Args:
+        log_dir: Directory to store log files
+        name: Log file prefix, the current date is appended
+        backup_count: Number of rotated backup files to keep
+
+    Returns:
+        QueueListener: Running listener, stop it on shutdown to flush pending records
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    log_file = os.path.join(log_dir, f"{name}_{datetime.now().strftime('%Y%m%d')}.log")
+
+    file_handler = RotatingFileHandler(log_file, maxBytes=1e6, backupCount=backup_count)  # 1MB max size
+    file_handler.setFormatter(LogFormatter(color=False))
+
+    log_queue = queue.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, file_handler)
+    listener.start()
+
+    logger.info(f"Logging to {log_file}")
+    return listener
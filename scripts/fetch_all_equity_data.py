@@ -110,7 +110,6 @@ def fetch_all_equity_data(batch_size=5, limit=None, verbose=False, interval=None
         }
         
         # Get rate limiting configurations
-        request_delay = config.get('equity_market_data', 'rate_limiting', 'request_delay')
         batch_delay = config.get('equity_market_data', 'rate_limiting', 'batch_delay')
         
         # Process in batches
@@ -126,47 +125,31 @@ def fetch_all_equity_data(batch_size=5, limit=None, verbose=False, interval=None
                 "tokens": []
             }
             
+            # Fetch the whole batch concurrently; request starts stay request_delay apart
+            token_rows = list(batch[['token', 'exch_seg', 'name']].itertuples(index=False, name=None))
+            responses = manager.fetch_equity_market_data_many(token_rows, interval=interval)
+            
             # Process each token in the batch
-            for _, row in batch.iterrows():
-                token = row['token']
-                exchange = row['exch_seg']
-                name = row['name']
-                
-                logger.info(f"Processing: {name} ({token})")
-                
-                # Fetch market data
-                market_data = manager.fetch_equity_market_data(token, exchange, name, interval=interval)
+            fetched = {}
+            fetched_results = []
+            for (token, exchange, name), market_data in zip(token_rows, responses):
+                logger.debug("Processing: %s (%s)", name, token)
                 
                 if market_data and market_data.get('status'):
                     data = market_data.get('data', [])
-                    records_count = len(data)
+                    fetched[token] = (name, data)
                     
-                    # Store in database
-                    if db_manager.store_historical_data(token, name, data):
-                        batch_results["success"] += 1
-                        results["success"] += 1
-                        
-                        token_result = {
-                            "token": token,
-                            "name": name,
-                            "records": records_count,
-                            "status": "success"
-                        }
+                    token_result = {
+                        "token": token,
+                        "name": name,
+                        "records": len(data),
+                        "status": "success"
+                    }
+                    
+                    if verbose and data:
+                        token_result["sample"] = data[:2]
                         
-                        if verbose and data:
-                            token_result["sample"] = data[:2]
-                            
-                        batch_results["tokens"].append(token_result)
-                        logger.info(f"✅ Successfully processed {name}: {records_count} records")
-                    else:
-                        batch_results["errors"] += 1
-                        results["errors"] += 1
-                        batch_results["tokens"].append({
-                            "token": token,
-                            "name": name,
-                            "status": "store_failed"
-                        })
-                        logger.error(f"❌ Failed to store data for {name}")
+                    fetched_results.append(token_result)
                 else:
                     batch_results["errors"] += 1
                     results["errors"] += 1
@@ -176,9 +159,24 @@ def fetch_all_equity_data(batch_size=5, limit=None, verbose=False, interval=None
                         "status": "fetch_failed"
                     })
                     logger.error(f"❌ Failed to fetch data for {name}")
-                
-                # Add a small delay to avoid API rate limits
-                time.sleep(request_delay)
+            
+            # Store the whole batch with one insert; tokens only count as successful once written
+            if fetched:
+                stored = db_manager.store_historical_data_bulk(fetched)
+                for token_result in fetched_results:
+                    if token_result["token"] in stored:
+                        batch_results["success"] += 1
+                        results["success"] += 1
+                        batch_results["tokens"].append(token_result)
+                    else:
+                        batch_results["errors"] += 1
+                        results["errors"] += 1
+                        batch_results["tokens"].append({
+                            "token": token_result["token"],
+                            "name": token_result["name"],
+                            "status": "store_failed"
+                        })
+                        logger.error(f"❌ Failed to store data for {token_result['name']}")
             
             results["batches"].append(batch_results)
             
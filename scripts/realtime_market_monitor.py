@@ -7,68 +7,17 @@ Continuously fetches real-time market data at regular intervals.
 import sys
 import time
 import argparse
-from datetime import datetime, time as dt_time
-import signal
-from logzero import logger, logfile
+from logzero import logger
 import os
-import logging
 
 # Add parent directory to path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.realtime_market_data_manager import RealtimeMarketDataManager
 from src.db_manager import DBManager
-from src.config_manager import config
-
-# Fix logging for Windows consoles
-def setup_console_logging():
-    """Configure the root logger to prevent Unicode errors in Windows console."""
-    # Replace Unicode characters with ASCII equivalents for console output
-    class AsciiFormatter(logging.Formatter):
-        def format(self, record):
-            msg = super().format(record)
-            # Replace Unicode characters with ASCII equivalents
-            return (msg.replace('✅', '[OK]')
-                      .replace('❌', '[ERROR]')
-                      .replace('✓', '[Y]')
-                      .replace('✗', '[N]'))
-    
-    # Configure the console handler with the ASCII formatter
-    console = logging.StreamHandler()
-    console.setFormatter(AsciiFormatter('%(levelname)s %(message)s'))
-    logging.getLogger().addHandler(console)
-    
-    # Remove existing handlers from the root logger
-    for handler in logging.getLogger().handlers[:]:
-        if isinstance(handler, logging.StreamHandler) and handler != console:
-            logging.getLogger().removeHandler(handler)
-
-# Global flag for graceful shutdown
-running = True
-
-def signal_handler(sig, frame):
-    """Handle SIGINT (Ctrl+C) to gracefully shutdown."""
-    global running
-    logger.info("Received shutdown signal, finishing current cycle and exiting...")
-    running = False
-
-def is_market_hours():
-    """Check if current time is within market hours."""
-    now = datetime.now().time()
-    
-    # Get market hours from config
-    market_start = dt_time.fromisoformat(config.get('market', 'trading_hours', 'start'))
-    market_end = dt_time.fromisoformat(config.get('market', 'trading_hours', 'end'))
-    
-    # Check if current time is within market hours
-    return market_start <= now <= market_end
-
-def setup_logging(log_dir):
-    """Setup logging with rotation."""
-    os.makedirs(log_dir, exist_ok=True)
-    log_file = os.path.join(log_dir, f"realtime_market_monitor_{datetime.now().strftime('%Y%m%d')}.log")
-    logfile(log_file, maxBytes=1e6, backupCount=3)  # 1MB max size, 3 backup files
-    logger.info(f"Logging to {log_file}")
+from scripts._monitor_common import (
+    setup_console_logging, shutdown_event, install_signal_handler, is_market_hours, setup_logging
+)
 
 def run_monitor(refresh_interval=60, include_equity=True, include_futures=True, include_options=False,
                equity_limit=None, futures_limit=None, options_limit=None, 
@@ -90,52 +39,45 @@ def run_monitor(refresh_interval=60, include_equity=True, include_futures=True,
         log_dir: Directory to store log files
     """
     # Setup logging
-    setup_logging(log_dir)
-    
-    # Create database manager
-    db_manager = DBManager()
-    
-    # Create real-time market data manager
-    realtime_manager = RealtimeMarketDataManager(db_manager=db_manager)
-    
-    # Initialize the global running flag
-    global running
-    running = True
-    
-    # Setup signal handler
-    signal.signal(signal.SIGINT, signal_handler)
-    
-    # Log monitor parameters
-    logger.info("=" * 60)
-    logger.info(f"Starting real-time market monitor with parameters:")
-    logger.info(f"- Refresh interval: {refresh_interval} seconds")
-    logger.info(f"- Include equity: {include_equity}")
-    logger.info(f"- Include futures: {include_futures}")
-    logger.info(f"- Include options: {include_options}")
-    if equity_limit:
-        logger.info(f"- Equity limit: {equity_limit}")
-    if futures_limit:
-        logger.info(f"- Futures limit: {futures_limit}")
-    if options_limit:
-        logger.info(f"- Options limit: {options_limit}")
-    if include_options:
-        logger.info(f"- ATM only: {atm_only}")
-        logger.info(f"- Strike buffer: {strike_buffer}")
-        logger.info(f"- Exact ATM only: {exact_atm_only}")
-    logger.info("=" * 60)
-    
-    # Main monitoring loop
-    iterations = 0
+    log_listener = setup_logging(log_dir, "realtime_market_monitor")
+    
+    db_manager = None
     
+    # Setup runs inside the try so the finally block flushes the log queue if it fails
     try:
-        # Use the running flag instead of True for the while loop condition
-        while running:
+        # Create database manager
+        db_manager = DBManager()
+        
+        # Create real-time market data manager
+        realtime_manager = RealtimeMarketDataManager(db_manager=db_manager)
+        
+        # Setup signal handler (also resets the shutdown event)
+        install_signal_handler()
+        
+        # Log monitor parameters
+        logger.info("=" * 60)
+        logger.info(f"Starting real-time market monitor with parameters:")
+        logger.info(f"- Refresh interval: {refresh_interval} seconds")
+        logger.info(f"- Include equity: {include_equity}")
+        logger.info(f"- Include futures: {include_futures}")
+        logger.info(f"- Include options: {include_options}")
+        if equity_limit:
+            logger.info(f"- Equity limit: {equity_limit}")
+        if futures_limit:
+            logger.info(f"- Futures limit: {futures_limit}")
+        if options_limit:
+            logger.info(f"- Options limit: {options_limit}")
+        if include_options:
+            logger.info(f"- ATM only: {atm_only}")
+            logger.info(f"- Strike buffer: {strike_buffer}")
+            logger.info(f"- Exact ATM only: {exact_atm_only}")
+        logger.info("=" * 60)
+        
+        # Main monitoring loop
+        iterations = 0
+        
+        while not shutdown_event.is_set():
             iterations += 1
-            
-            # Check if we should exit
-            if not running:
-                logger.info("Stopping monitor due to interrupt signal...")
-                break
                 
             # Check if market is open
             market_open = is_market_hours()
@@ -171,17 +113,13 @@ def run_monitor(refresh_interval=60, include_equity=True, include_futures=True,
             else:
                 logger.info(f"Iteration {iterations}: Market is closed, skipping data fetch.")
             
-            # Wait for next iteration, but check for interrupt every second
+            # Wait for next iteration, returning early on interrupt
             logger.info(f"Waiting {refresh_interval} seconds until next refresh...")
-            for _ in range(refresh_interval):
-                if not running:
-                    logger.info("Stopping monitor due to interrupt signal...")
-                    break
-                time.sleep(1)
+            if shutdown_event.wait(refresh_interval):
+                logger.info("Stopping monitor due to interrupt signal...")
                 
     except KeyboardInterrupt:
-        # Set running to False if we catch a KeyboardInterrupt
-        running = False
+        shutdown_event.set()
         logger.info("Monitor stopped by user.")
     except Exception as e:
         logger.error(f"Monitor stopped due to an error: {str(e)}")
@@ -190,6 +128,9 @@ def run_monitor(refresh_interval=60, include_equity=True, include_futures=True,
         if db_manager:
             db_manager.close()
         logger.info("Real-time market monitor shutdown complete.")
+        
+        # Flush queued log records to the log file
+        log_listener.stop()
 
 def main():
     """Main entry point with argument parsing."""
@@ -21,6 +21,7 @@ def main():
     parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to bind the server to")
     parser.add_argument("--port", type=int, default=8000, help="Port to bind the server to")
     parser.add_argument("--reload", action="store_true", help="Enable auto-reload for development")
+    parser.add_argument("--access-log", action="store_true", help="Enable per-request access logging")
     
     args = parser.parse_args()
     
@@ -38,13 +39,25 @@ def main():
         logger.error(f"❌ Failed to verify data files: {str(e)}")
         logger.warning("API will start, but data may not be available")
     
+    # The API serves a single process: DuckDB lets only one process hold a database
+    # file read-write, so extra worker processes would fail to open it
+    if args.reload:
+        # uvicorn needs an import string to spawn the reloader process
+        app = "api.main:app"
+    else:
+        from api.main import app
+    
     # Run the server
     logger.info(f"🚀 Starting API server at {args.host}:{args.port}")
     uvicorn.run(
-        "api.main:app",
+        app,
         host=args.host,
         port=args.port,
-        reload=args.reload
+        reload=args.reload,
+        loop="auto",  # uvloop when installed (uvicorn[standard]), asyncio otherwise
+        http="auto",  # httptools when installed, h11 otherwise
+        log_level="info",
+        access_log=args.access_log
     )
 
 if __name__ == "__main__":
@@ -1,12 +1,58 @@
 import os
+import asyncio
 from dotenv import load_dotenv
 from SmartApi import SmartConnect
 import pyotp
 from logzero import logger
-from typing import Optional, Dict, Any, List
+from src.config_manager import config
+from typing import Optional, Dict, Any, List, Callable, Iterable
 
 load_dotenv()
 
+def call_concurrently(func: Callable[[Any], Any], items: Iterable[Any],
+                      max_concurrent: int = 1, request_delay: float = 0.0) -> List[Any]:
+    """
+    Call a blocking API function for each item with bounded concurrency.
+    
+    Up to max_concurrent calls run at once on worker threads, and call starts are
+    spaced at least request_delay seconds apart so the API rate limit still holds.
+    
+    Args:
+        func: Blocking function taking one item, e.g. a wrapper around a SmartAPI call
+        items: Arguments to call func with
+        max_concurrent: Maximum calls in flight
+        request_delay: Minimum seconds between call starts
+        
+    Returns:
+        List[Any]: func results, in item order
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    
+    async def run_all():
+        semaphore = asyncio.Semaphore(max(1, max_concurrent))
+        pace_lock = asyncio.Lock()
+        loop = asyncio.get_running_loop()
+        next_start = loop.time()
+        
+        async def call(item):
+            nonlocal next_start
+            async with semaphore:
+                # Reserve the next start slot, then wait for it outside the lock
+                async with pace_lock:
+                    now = loop.time()
+                    start = max(now, next_start)
+                    next_start = start + request_delay
+                if start > now:
+                    await asyncio.sleep(start - now)
+                # SmartAPI is synchronous, so the call itself runs on a worker thread
+                return await asyncio.to_thread(func, item)
+        
+        return await asyncio.gather(*(call(item) for item in items))
+    
+    return asyncio.run(run_all())
+
 class AngelOneConnector:
     def __init__(self):
         """Initialize the Angel One connector with credentials from environment variables."""
@@ -42,7 +88,13 @@ class AngelOneConnector:
             bool: True if connection is successful, False otherwise
         """
         try:
-            self.api = SmartConnect(api_key=self.api_key)
+            # A pooled requests.Session lets concurrent calls (see call_concurrently) reuse
+            # keep-alive connections; without it SmartConnect opens a new one per request
+            pool_size = config.get('api', 'angel_one', 'http_pool_size') or 8
+            self.api = SmartConnect(
+                api_key=self.api_key,
+                pool={'pool_connections': pool_size, 'pool_maxsize': pool_size}
+            )
             totp = pyotp.TOTP(self.totp_secret)
             data = self.api.generateSession(self.client_id, self.pin, totp.now())
             
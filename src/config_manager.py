@@ -4,15 +4,28 @@ Handles loading and accessing configuration values.
 """
 
 import os
+import json
 import yaml
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 from logzero import logger
 
+try:
+    # libyaml C bindings, much faster than the pure-Python loader
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 class ConfigManager:
     """Manages application configuration from YAML file."""
     
     _instance = None
     
+    # Resolved once when the class is defined
+    _CONFIG_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'config', 'config.yaml'))
+    
+    # Pre-parsed copy of config.yaml, in the project's git-ignored .cache directory
+    _CACHE_FILE = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '.cache', 'config.json'))
+    
     def __new__(cls):
         """Implement singleton pattern."""
         if cls._instance is None:
@@ -25,22 +38,104 @@ class ConfigManager:
         if self._initialized:
             return
             
-        self.config_path = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)),
-            'config',
-            'config.yaml'
-        )
+        self.config_path = self._CONFIG_PATH
         self.config: Dict[str, Any] = {}
-        self._load_config()
+        # Every node of the config tree keyed by its key path, for single-lookup get()
+        self._flat: Dict[Tuple[str, ...], Any] = {}
+        # Incremented on every (re)load so consumers can drop derived caches
+        self.version = 0
+        # The file is read on first access rather than at import time
+        self._loaded = False
+        self._load_error: Optional[Exception] = None
+        self._last_mtime = None
         self._initialized = True
     
+    def _read_cached_config(self, stat: os.stat_result) -> Any:
+        """
+        Read the pre-parsed JSON cache of config.yaml.
+        
+        Args:
+            stat: Current stat of config.yaml
+            
+        Returns:
+            Any: Parsed configuration, None if the cache is missing or was built from a different file
+        """
+        try:
+            with open(self._CACHE_FILE, 'rb') as f:
+                cached = json.loads(f.read())
+            # The cache must come from this exact file; any change to the YAML's mtime or
+            # size invalidates it, including an older file restored with its original timestamp
+            if (cached.get('path') != self.config_path or cached.get('mtime_ns') != stat.st_mtime_ns
+                    or cached.get('size') != stat.st_size):
+                return None
+            return cached.get('config')
+        except (OSError, ValueError, AttributeError):
+            return None
+    
+    def _write_cached_config(self, stat: os.stat_result) -> None:
+        """
+        Write the parsed configuration as a JSON cache for the next load.
+        
+        Args:
+            stat: Stat of the config.yaml the configuration was parsed from
+        """
+        try:
+            # Skip configs JSON can't represent exactly (e.g. dates or non-string keys)
+            if json.loads(json.dumps(self.config)) != self.config:
+                return
+            os.makedirs(os.path.dirname(self._CACHE_FILE), exist_ok=True)
+            tmp_file = f"{self._CACHE_FILE}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({
+                    'path': self.config_path,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'size': stat.st_size,
+                    'config': self.config
+                }, f)
+            os.replace(tmp_file, self._CACHE_FILE)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write configuration cache: {str(e)}")
+    
+    def _flatten(self, node: Any, path: Tuple[str, ...] = ()) -> None:
+        """
+        Index a config node and all of its children by key path.
+        
+        Args:
+            node: Config node to index
+            path: Key path leading to the node
+        """
+        # Empty sections are reported as missing, like a failed lookup
+        self._flat[path] = node if node != {} else None
+        if isinstance(node, dict):
+            for key, value in node.items():
+                self._flatten(value, path + (key,))
+    
     def _load_config(self) -> None:
-        """Load configuration from YAML file."""
+        """Load configuration from YAML file, reusing the JSON cache if it matches the file."""
         try:
-            with open(self.config_path, 'r') as f:
-                self.config = yaml.safe_load(f)
+            stat = os.stat(self.config_path)
+            mtime_ns = stat.st_mtime_ns
+            if self._loaded and mtime_ns == self._last_mtime:
+                # File unchanged since the last load, keep the parsed config
+                return
+            
+            cached = self._read_cached_config(stat)
+            if cached is not None:
+                self.config = cached
+            else:
+                with open(self.config_path, 'r') as f:
+                    self.config = yaml.load(f, Loader=SafeLoader)
+                self._write_cached_config(stat)
+            self._flat = {}
+            self._flatten(self.config)
+            self.version += 1
+            self._last_mtime = mtime_ns
+            self._loaded = True
+            self._load_error = None
             logger.info("✅ Configuration loaded successfully")
         except Exception as e:
+            # Kept so get() re-raises it without re-reading the file; reload() retries
+            self._load_error = e
             logger.error(f"❌ Error loading configuration: {str(e)}")
             raise
     
@@ -57,13 +152,15 @@ class ConfigManager:
         Example:
             config.get('api', 'angel_one', 'token_master_url')
         """
-        value = self.config
-        for key in keys:
-            value = value.get(key, {})
-        return value if value != {} else None
+        if not self._loaded:
+            if self._load_error is not None:
+                # A broken config keeps failing loudly instead of returning None values
+                raise self._load_error
+            self._load_config()
+        return self._flat.get(keys)
     
     def reload(self) -> None:
-        """Reload configuration from file."""
+        """Reload configuration from file, a no-op if the file is unchanged."""
         self._load_config()
         
 config = ConfigManager()  # Create singleton instance 
\ No newline at end of file
@@ -4,173 +4,489 @@ Handles all database interactions for token storage.
 """
 
 import duckdb
+import logging
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from logzero import logger
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set, Tuple
 from src.config_manager import config
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+
+# Verification query run by store_tokens at DEBUG level: per token type row and
+# strike_distance counts plus a few sample rows, all from a single scan of token_master
+_TOKEN_VERIFICATION_SQL = """
+    WITH agg AS (
+        SELECT token_type, COUNT(*) AS cnt, COUNT(strike_distance) AS with_sd
+        FROM token_master
+        GROUP BY token_type
+    ),
+    samples AS (
+        SELECT token, symbol, name, token_type, futures_token, expiry, strike, strike_distance
+        FROM token_master
+        WHERE token_type IN ('FUTURES', 'EQUITY') OR strike_distance IS NOT NULL
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY token_type ORDER BY token)
+            <= CASE WHEN token_type IN ('FUTURES', 'EQUITY') THEN 3 ELSE 5 END
+    )
+    SELECT a.token_type, a.cnt, a.with_sd,
+           s.token, s.symbol, s.name, s.futures_token, s.expiry, s.strike, s.strike_distance
+    FROM agg a
+    LEFT JOIN samples s ON s.token_type = a.token_type
+    ORDER BY a.token_type DESC, s.token
+"""
+
+# Numeric columns stored as DOUBLE; older databases created them as DECIMAL(18,6)
+_DOUBLE_COLUMNS = {
+    'token_master': ('strike', 'tick_size', 'strike_distance'),
+    'historical_data': ('open', 'high', 'low', 'close'),
+    'realtime_market_data': (
+        'ltp', 'open', 'high', 'low', 'close', 'net_change', 'percent_change', 'avg_price',
+        'lower_circuit', 'upper_circuit', 'week_low_52', 'week_high_52'
+    ),
+    'technical_indicators': ('value',),
+    'technical_indicators_summary': (
+        'sma_50', 'sma_100', 'sma_200', 'ema_20', 'ema_50', 'ema_200', 'rsi_14', 'rsi_21',
+        'volatility_21', 'volatility_200', 'last_close'
+    ),
+}
+
+_TOKEN_MASTER_DDL = """
+    CREATE TABLE IF NOT EXISTS token_master (
+        token VARCHAR,
+        symbol VARCHAR,
+        name VARCHAR,
+        expiry DATE,
+        strike DOUBLE,
+        lotsize INTEGER,
+        instrumenttype VARCHAR,
+        exch_seg VARCHAR,
+        tick_size DOUBLE,
+        token_type VARCHAR,  -- 'FUTURES' or 'EQUITY'
+        futures_token VARCHAR,  -- Reference to futures token for equity
+        strike_distance DOUBLE,  -- Distance between adjacent strikes for options
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (token)
+    )
+"""
+
+# Append-only snapshot table: timestamp defaults to the insert time, so rows never collide
+# and a primary key would only add an index probe to every insert
+_REALTIME_MARKET_DATA_DDL = """
+    CREATE TABLE IF NOT EXISTS realtime_market_data (
+        exchange VARCHAR,
+        trading_symbol VARCHAR,
+        symbol_token VARCHAR,
+        ltp DOUBLE,
+        open DOUBLE,
+        high DOUBLE,
+        low DOUBLE,
+        close DOUBLE,
+        last_trade_qty INTEGER,
+        exch_feed_time TIMESTAMP,
+        exch_trade_time TIMESTAMP,
+        net_change DOUBLE,
+        percent_change DOUBLE,
+        avg_price DOUBLE,
+        trade_volume BIGINT,
+        opn_interest BIGINT,
+        lower_circuit DOUBLE,
+        upper_circuit DOUBLE,
+        tot_buy_quan BIGINT,
+        tot_sell_quan BIGINT,
+        week_low_52 DOUBLE,
+        week_high_52 DOUBLE,
+        depth_json JSON,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+_HISTORICAL_DATA_DDL = """
+    CREATE TABLE IF NOT EXISTS historical_data (
+        token VARCHAR,
+        symbol_name VARCHAR,
+        timestamp TIMESTAMP,
+        open DOUBLE,
+        high DOUBLE,
+        low DOUBLE,
+        close DOUBLE,
+        volume BIGINT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (token, timestamp)
+    )
+"""
+
+# Append-only variant for ingest-heavy setups (database.historical_use_pk: false); without the
+# primary key's index, inserts skip the per-row uniqueness probe and re-fetched candles are
+# replaced by a delete-then-insert instead of ON CONFLICT
+_HISTORICAL_DATA_NO_PK_DDL = _HISTORICAL_DATA_DDL.replace(",\n        PRIMARY KEY (token, timestamp)", "")
+
+_TECHNICAL_INDICATORS_DDL = """
+    CREATE TABLE IF NOT EXISTS technical_indicators (
+        token VARCHAR,
+        symbol_name VARCHAR,
+        indicator_name VARCHAR,
+        timestamp TIMESTAMP,
+        value DOUBLE,
+        period INTEGER,
+        calculation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (token, indicator_name, period, timestamp)
+    )
+"""
+
+_TECHNICAL_INDICATORS_SUMMARY_DDL = """
+    CREATE TABLE IF NOT EXISTS technical_indicators_summary (
+        token VARCHAR,
+        symbol_name VARCHAR,
+        trade_date DATE,
+        sma_50 DOUBLE,
+        sma_100 DOUBLE,
+        sma_200 DOUBLE,
+        ema_20 DOUBLE,
+        ema_50 DOUBLE,
+        ema_200 DOUBLE,
+        rsi_14 DOUBLE,
+        rsi_21 DOUBLE,
+        volatility_21 DOUBLE,
+        volatility_200 DOUBLE,
+        last_close DOUBLE,
+        last_volume BIGINT,
+        update_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (token)
+    )
+"""
+
+# Created in this order by _init_tables, keyed by table name
+_TABLE_DDL = {
+    'token_master': _TOKEN_MASTER_DDL,
+    'realtime_market_data': _REALTIME_MARKET_DATA_DDL,
+    'historical_data': _HISTORICAL_DATA_DDL,
+    'technical_indicators': _TECHNICAL_INDICATORS_DDL,
+    'technical_indicators_summary': _TECHNICAL_INDICATORS_SUMMARY_DDL,
+}
+
+# Column type casts applied by export_market_summary_to_parquet
+_EXPORT_CASTS = {
+    'DECIMAL': 'DOUBLE',
+    'DATE': 'TIMESTAMP',
+}
+
+# Connections shared by DBManager instances: db_path -> {'conn', 'refs', 'initialized'}
+_POOL: Dict[str, Dict[str, Any]] = {}
+_POOL_LOCK = threading.RLock()
+
+# Database files whose schema was created/migrated by this process; a reconnect after the
+# shared connection was closed skips the DDL and information_schema probe
+_SCHEMA_INITIALIZED: set = set()
+
+# token_master rewrites per database file in this process: db_path -> version. Shared by all
+# managers of a file, so caches built on one manager see writes made through another
+_TOKEN_MASTER_VERSIONS: Dict[str, int] = {}
 
 class DBManager:
     """Manages DuckDB database operations."""
     
-    def __init__(self, db_path: Optional[str] = None):
+    # Arrow schema for token_master ingest, built once and shared by all instances
+    TOKEN_SCHEMA = pa.schema([
+        ('token', pa.string()),
+        ('symbol', pa.string()),
+        ('name', pa.string()),
+        ('expiry', pa.date32()),
+        ('strike', pa.float64()),
+        ('lotsize', pa.int32()),
+        ('instrumenttype', pa.string()),
+        ('exch_seg', pa.string()),
+        ('tick_size', pa.float64()),
+        ('token_type', pa.string()),
+        ('futures_token', pa.string()),
+        ('strike_distance', pa.float64())
+    ])
+    _TOKEN_SCHEMA_NO_DISTANCE = TOKEN_SCHEMA.remove(TOKEN_SCHEMA.get_field_index('strike_distance'))
+    
+    # Arrow schema for historical_data ingest, matches the table's column types
+    HISTORICAL_SCHEMA = pa.schema([
+        ('token', pa.string()),
+        ('symbol_name', pa.string()),
+        ('timestamp', pa.timestamp('us')),  # DuckDB TIMESTAMP resolution
+        ('open', pa.float64()),
+        ('high', pa.float64()),
+        ('low', pa.float64()),
+        ('close', pa.float64()),
+        ('volume', pa.int64())
+    ])
+    
+    def __init__(self, db_path: Optional[str] = None, read_only: bool = False):
         """
         Initialize database connection.
         
         Args:
             db_path: Optional database path, uses config value if not provided
+            read_only: Open a private read-only connection (for readers such as the API)
+                instead of the shared read-write one; close() releases the file again
         """
         self.db_path = db_path or config.get('database', 'default_path')
+        self.read_only = read_only
+        # Memoized (token_master_version, MAX(created_at)) of token_master
+        self._latest_token_update: Optional[Tuple[int, datetime]] = None
+        self._released = False
+        # Post-write verification queries are opt-in, they only feed DEBUG logs
+        self._verify_on_write = os.getenv('NFO_VERIFY_WRITES', '0') == '1'
+        # Whether historical_data has its primary key, probed on the first historical write
+        self._historical_has_pk: Optional[bool] = None
+        # Set once market_summary_view is known to exist, see ensure_market_summary_view()
+        self._market_view_ready = False
         try:
-            self.conn = duckdb.connect(self.db_path)
-            self._init_tables()
+            self._acquire_connection()
         except duckdb.duckdb.SerializationException as e:
             logger.error(f"❌ Database corruption detected: {str(e)}")
+            if read_only:
+                # Readers never recreate the database file
+                raise
             self._handle_corrupted_database()
     
+    def _acquire_connection(self) -> None:
+        """
+        Check out a cursor on the shared connection for db_path.
+        
+        The connection is opened and the tables initialized only for the first
+        manager of a database file; later managers reuse both. Read-only managers
+        open their own connection and never create or migrate tables.
+        """
+        if self.read_only:
+            self.conn = duckdb.connect(self.db_path, read_only=True)
+            return
+        
+        with _POOL_LOCK:
+            entry = _POOL.get(self.db_path)
+            if entry is None:
+                entry = {
+                    'conn': duckdb.connect(self.db_path, config=self._connection_config()),
+                    'refs': 0,
+                    'initialized': False
+                }
+                _POOL[self.db_path] = entry
+            entry['refs'] += 1
+            
+            # Each manager gets its own cursor so instances used from different threads don't share state
+            self.conn = entry['conn'].cursor()
+            if not entry['initialized']:
+                if self.db_path in _SCHEMA_INITIALIZED and os.path.exists(self.db_path):
+                    entry['initialized'] = True
+                elif self._init_tables():
+                    entry['initialized'] = True
+                    _SCHEMA_INITIALIZED.add(self.db_path)
+    
+    @contextmanager
+    def _checkout(self):
+        """
+        Open a separate cursor for a read, so its result set doesn't replace one
+        still pending on self.conn.
+        
+        Yields:
+            duckdb.DuckDBPyConnection: Cursor on this manager's database, closed afterwards
+        """
+        cursor = self.conn.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+    
+    def fetch_arrow(self, sql: str, params: Optional[List[Any]] = None) -> pa.Table:
+        """
+        Run a read query and return its result as an Arrow table.
+        
+        Args:
+            sql: Query to run
+            params: Optional query parameters
+            
+        Returns:
+            pa.Table: Query result
+        """
+        with self._checkout() as cursor:
+            return cursor.execute(sql, params or []).fetch_arrow_table()
+    
+    @staticmethod
+    def _drop_pooled_connection(db_path: str) -> None:
+        """
+        Close and forget the shared connection for a database file.
+        
+        Args:
+            db_path: Database file path
+        """
+        with _POOL_LOCK:
+            entry = _POOL.pop(db_path, None)
+            if entry is not None:
+                try:
+                    entry['conn'].close()
+                except Exception:
+                    pass
+    
+    @staticmethod
+    def _connection_config() -> Dict[str, str]:
+        """
+        Build DuckDB connection settings from config.
+        
+        Returns:
+            Dict[str, str]: Settings to pass to duckdb.connect, unset values use DuckDB defaults
+        """
+        settings = {
+            key: config.get('database', 'connection', key)
+            for key in ('threads', 'memory_limit', 'preserve_insertion_order',
+                        'temp_directory', 'enable_object_cache', 'checkpoint_threshold')
+        }
+        return {
+            key: str(value).lower() if isinstance(value, bool) else str(value)
+            for key, value in settings.items() if value is not None
+        }
+    
     def _init_tables(self):
         """Initialize required database tables."""
         try:
-            # Create a single master table for all tokens
-            self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS token_master (
-                    token VARCHAR,
-                    symbol VARCHAR,
-                    name VARCHAR,
-                    expiry DATE,
-                    strike DECIMAL(18,6),
-                    lotsize INTEGER,
-                    instrumenttype VARCHAR,
-                    exch_seg VARCHAR,
-                    tick_size DECIMAL(18,6),
-                    token_type VARCHAR,  -- 'FUTURES' or 'EQUITY'
-                    futures_token VARCHAR,  -- Reference to futures token for equity
-                    strike_distance DECIMAL(18,6),  -- Distance between adjacent strikes for options
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (token)
-                )
-            """)
+            # One catalog read decides which tables still need creating; on an
+            # existing database no CREATE statement is parsed at all
+            existing_tables = {
+                row[0] for row in self.conn.execute("""
+                    SELECT table_name FROM information_schema.tables
+                    WHERE table_type = 'BASE TABLE' AND list_contains(?, table_name)
+                """, [list(_TABLE_DDL)]).fetchall()
+            }
+            missing_tables = [name for name in _TABLE_DDL if name not in existing_tables]
+            if missing_tables:
+                historical_use_pk = config.get('database', 'historical_use_pk') is not False
+                # Create everything in one transaction so a fresh file pays a single commit
+                self.conn.execute("BEGIN TRANSACTION")
+                try:
+                    for table_name in missing_tables:
+                        table_ddl = _TABLE_DDL[table_name]
+                        if table_ddl is _HISTORICAL_DATA_DDL and not historical_use_pk:
+                            table_ddl = _HISTORICAL_DATA_NO_PK_DDL
+                        self.conn.execute(table_ddl)
+                    self.conn.execute("COMMIT")
+                except Exception:
+                    self.conn.execute("ROLLBACK")
+                    raise
             
-            # Create real-time market data table
-            self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS realtime_market_data (
-                    exchange VARCHAR,
-                    trading_symbol VARCHAR,
-                    symbol_token VARCHAR,
-                    ltp DECIMAL(18,6),
-                    open DECIMAL(18,6),
-                    high DECIMAL(18,6),
-                    low DECIMAL(18,6),
-                    close DECIMAL(18,6),
-                    last_trade_qty INTEGER,
-                    exch_feed_time TIMESTAMP,
-                    exch_trade_time TIMESTAMP,
-                    net_change DECIMAL(18,6),
-                    percent_change DECIMAL(18,6),
-                    avg_price DECIMAL(18,6),
-                    trade_volume BIGINT,
-                    opn_interest BIGINT,
-                    lower_circuit DECIMAL(18,6),
-                    upper_circuit DECIMAL(18,6),
-                    tot_buy_quan BIGINT,
-                    tot_sell_quan BIGINT,
-                    week_low_52 DECIMAL(18,6),
-                    week_high_52 DECIMAL(18,6),
-                    depth_json TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (symbol_token, timestamp)
-                )
-            """)
+            # Bring tables created by older versions up to the current schema
+            self._migrate_legacy_columns()
             
-            # Create historical data table
-            self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS historical_data (
-                    token VARCHAR,
-                    symbol_name VARCHAR,
-                    timestamp TIMESTAMP,
-                    open DECIMAL(18,6),
-                    high DECIMAL(18,6),
-                    low DECIMAL(18,6),
-                    close DECIMAL(18,6),
-                    volume BIGINT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (token, timestamp)
-                )
-            """)
-            
-            # Create technical indicators table
-            self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS technical_indicators (
-                    token VARCHAR,
-                    symbol_name VARCHAR,
-                    indicator_name VARCHAR,
-                    timestamp TIMESTAMP,
-                    value DECIMAL(18,6),
-                    period INTEGER,
-                    calculation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (token, indicator_name, period, timestamp)
-                )
-            """)
-            
-            # Create technical_indicators_summary table (wide format, latest values only)
-            self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS technical_indicators_summary (
-                    token VARCHAR,
-                    symbol_name VARCHAR,
-                    trade_date DATE,
-                    sma_50 DECIMAL(18,6),
-                    sma_100 DECIMAL(18,6),
-                    sma_200 DECIMAL(18,6),
-                    ema_20 DECIMAL(18,6),
-                    ema_50 DECIMAL(18,6),
-                    ema_200 DECIMAL(18,6),
-                    rsi_14 DECIMAL(18,6),
-                    rsi_21 DECIMAL(18,6),
-                    volatility_21 DECIMAL(18,6),
-                    volatility_200 DECIMAL(18,6),
-                    last_close DECIMAL(18,6),
-                    last_volume BIGINT,
-                    update_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (token)
-                )
-            """)
-            
-            # Initialize market summary view
+            # Initialize market summary view (after migrations, so it binds to the final column types)
             self._init_market_summary_view()
             
-            # Check if strike_distance column exists, add it if not (for backward compatibility)
-            # Instead of selecting from the column directly, we'll check the information schema
-            try:
-                # Check if the column exists using information schema
-                column_check = self.conn.execute("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'token_master' AND column_name = 'strike_distance'
-                """).fetchall()
-                
-                if not column_check:
-                    # Column doesn't exist, add it
-                    logger.info("Adding strike_distance column to token_master table...")
-                    self.conn.execute("""
-                        ALTER TABLE token_master ADD COLUMN strike_distance DECIMAL(18,6)
-                    """)
-                    logger.info("✅ strike_distance column added successfully")
-            except Exception as e:
-                # Handle error during column check/addition
-                logger.warning(f"⚠️ Note: Could not verify or add strike_distance column: {str(e)}")
-                logger.warning("This may happen with a fresh database; proceeding with normal operation.")
-            
             logger.info("✅ Database tables initialized successfully")
             return True
+        except duckdb.duckdb.SerializationException as e:
+            # Only an unreadable file is recreated; any other error leaves the data alone
+            logger.error(f"❌ Database corruption detected while initializing tables: {str(e)}")
+            self._handle_corrupted_database()
+            return False
         except Exception as e:
             logger.error(f"❌ Error initializing tables: {str(e)}")
-            # Check if we need to handle database corruption
-            self._handle_corrupted_database()
             return False
     
+    def _migrate_legacy_columns(self):
+        """
+        Apply one-shot column migrations for databases created by older versions.
+        
+        One constraint probe decides whether realtime_market_data still needs its
+        primary key removed, and a single information_schema probe drives the
+        strike_distance column addition, the DECIMAL(18,6) to DOUBLE conversion and
+        the depth_json TEXT to JSON conversion; on a current schema nothing else runs.
+        Each step is attempted on its own, and the column types are probed again
+        afterwards so a partial migration fails table initialization.
+        
+        Raises:
+            RuntimeError: If any column is still on its legacy type after migrating
+        """
+        # realtime_market_data used to have PRIMARY KEY (symbol_token, timestamp); DuckDB
+        # cannot drop a constraint, so the table is rebuilt once without it. The rebuild
+        # uses the current DDL, so it also brings the realtime column types up to date
+        realtime_has_pk = self.conn.execute("""
+            SELECT COUNT(*) > 0
+            FROM duckdb_constraints()
+            WHERE table_name = 'realtime_market_data' AND constraint_type = 'PRIMARY KEY'
+        """).fetchone()[0]
+        if realtime_has_pk:
+            logger.info("Rebuilding realtime_market_data without its primary key...")
+            self.conn.execute("BEGIN TRANSACTION")
+            try:
+                self.conn.execute(_REALTIME_MARKET_DATA_DDL.replace(
+                    "realtime_market_data", "realtime_market_data_rebuild"))
+                self.conn.execute("""
+                    INSERT INTO realtime_market_data_rebuild BY NAME
+                    SELECT * FROM realtime_market_data
+                """)
+                self.conn.execute("DROP TABLE realtime_market_data")
+                self.conn.execute("ALTER TABLE realtime_market_data_rebuild RENAME TO realtime_market_data")
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            logger.info("✅ realtime_market_data rebuilt without primary key")
+        
+        columns = self._legacy_column_types()
+        
+        # strike_distance was added after the first release of token_master
+        if ('token_master', 'strike_distance') not in columns:
+            logger.info("Adding strike_distance column to token_master table...")
+            self.conn.execute("ALTER TABLE token_master ADD COLUMN strike_distance DOUBLE")
+            logger.info("✅ strike_distance column added successfully")
+        
+        migrations = [
+            (table, column, 'DOUBLE')
+            for (table, column), data_type in columns.items()
+            if data_type.startswith('DECIMAL') and column in _DOUBLE_COLUMNS[table]
+        ]
+        # depth_json was stored as TEXT; JSON keeps the same text but is validated on
+        # insert and can be queried with ->/->> path operators
+        if columns.get(('realtime_market_data', 'depth_json')) == 'VARCHAR':
+            migrations.append(('realtime_market_data', 'depth_json', 'JSON'))
+        if not migrations:
+            return
+        
+        # An ALTER can fail on its own (e.g. DuckDB refuses to retype a column of an
+        # indexed table), so one failure doesn't stop the remaining columns
+        for table, column, target_type in migrations:
+            logger.info(f"Migrating {table}.{column} from {columns[(table, column)]} to {target_type}...")
+            try:
+                self.conn.execute(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} TYPE {target_type} USING CAST({column} AS {target_type})"
+                )
+            except Exception as e:
+                logger.error(f"❌ Could not migrate {table}.{column}: {str(e)}")
+        
+        migrated_columns = self._legacy_column_types()
+        remaining = [
+            f"{table}.{column} ({migrated_columns[(table, column)]})"
+            for table, column, target_type in migrations
+            if migrated_columns[(table, column)] != target_type
+        ]
+        if remaining:
+            raise RuntimeError(f"Legacy column types could not be migrated: {', '.join(remaining)}")
+        logger.info(f"✅ Migrated {len(migrations)} legacy columns")
+    
+    def _legacy_column_types(self) -> Dict[Tuple[str, str], str]:
+        """
+        Read the column types of the tables covered by _migrate_legacy_columns.
+        
+        Returns:
+            Dict[Tuple[str, str], str]: (table, column) -> DuckDB data type
+        """
+        return {
+            (table, column): data_type
+            for table, column, data_type in self.conn.execute("""
+                SELECT table_name, column_name, data_type
+                FROM information_schema.columns
+                WHERE list_contains(?, table_name)
+            """, [list(_DOUBLE_COLUMNS)]).fetchall()
+        }
+    
     def _init_market_summary_view(self):
         """Initialize the market summary view."""
+        self._market_view_ready = False
         try:
             # Check if the sql file exists
             sql_path = os.path.join("sqls", "market_summary_view.sql")
@@ -181,51 +497,63 @@ class DBManager:
                 
                 # Execute the SQL to create/replace the view
                 self.conn.execute(sql)
+                self._market_view_ready = True
                 logger.info("✅ Market summary view initialized successfully")
             else:
                 logger.warning(f"⚠️ Market summary view SQL file not found: {sql_path}")
         except Exception as e:
             logger.error(f"❌ Error initializing market summary view: {str(e)}")
             
-    def export_market_summary_to_parquet(self, output_path=None):
+    def ensure_market_summary_view(self) -> bool:
+        """
+        Make sure market_summary_view exists, creating it if needed.
+        
+        The catalog is only checked until the view is known to exist; after that
+        the cached flag answers without a query.
+        
+        Returns:
+            bool: True if the view exists
+        """
+        if self._market_view_ready:
+            return True
+        
+        # Check if the view exists
+        with self._checkout() as cursor:
+            check_result = cursor.execute("""
+                SELECT name FROM sqlite_master 
+                WHERE type='view' AND name='market_summary_view'
+            """).fetchall()
+        
+        if check_result:
+            self._market_view_ready = True
+        elif self.read_only:
+            logger.error("❌ The market_summary_view does not exist and can't be created read-only")
+        else:
+            logger.warning("The market_summary_view does not exist, attempting to create it")
+            self._init_market_summary_view()
+        return self._market_view_ready
+    
+    def export_market_summary_to_parquet(self, output_path=None, query=None):
         """
         Export market summary data to a Parquet file.
         
         Args:
             output_path: Optional custom output path for the Parquet file
+            query: Optional SQL query to export instead of market_summary_view
             
         Returns:
             bool: Success status
         """
         logger.info("Exporting market summary view to Parquet file...")
         try:
-            # Check if the view exists
-            check_result = self.conn.execute("""
-                SELECT name FROM sqlite_master 
-                WHERE type='view' AND name='market_summary_view'
-            """).fetchall()
-            
-            if not check_result:
-                logger.warning("The market_summary_view does not exist, attempting to create it")
-                self._init_market_summary_view()
-                
-                # Check again
-                check_result = self.conn.execute("""
-                    SELECT name FROM sqlite_master 
-                    WHERE type='view' AND name='market_summary_view'
-                """).fetchall()
-                
-                if not check_result:
-                    logger.error("Failed to create market_summary_view")
-                    return False
-            
-            # Query the view
-            result = self.conn.execute("SELECT * FROM market_summary_view").fetchdf()
-            
-            if result.empty:
-                logger.warning("The market_summary_view is empty")
+            if query:
+                source = f"({query.strip().rstrip(';')})"
+            elif self.ensure_market_summary_view():
+                source = "market_summary_view"
+            else:
+                logger.error("Failed to create market_summary_view")
                 return False
-                
+            
             # Create exports directory if it doesn't exist
             os.makedirs("exports", exist_ok=True)
             
@@ -234,144 +562,191 @@ class DBManager:
                 parquet_file = output_path
             else:
                 parquet_file = os.path.join("exports", "market_summary.parquet")
+            
+            # Query the view on a separate cursor
+            with self._checkout() as cursor:
+                # DECIMAL and DATE columns are cast so readers get the same float64/datetime64
+                # dtypes the pandas-written file had
+                select_list = []
+                for name, col_type, *_ in cursor.execute(f"DESCRIBE SELECT * FROM {source}").fetchall():
+                    cast_type = _EXPORT_CASTS.get(col_type.split("(")[0])
+                    select_list.append(f'CAST("{name}" AS {cast_type}) AS "{name}"' if cast_type else f'"{name}"')
                 
-            result.to_parquet(parquet_file, index=False)
+                # DuckDB streams the query straight into its Parquet writer, without a pandas
+                # round-trip. Writing to a temp file and renaming keeps API readers from seeing
+                # a partial file, and keeps the previous export if the view is empty
+                tmp_file = f"{parquet_file}.tmp"
+                row_count = cursor.execute(f"""
+                    COPY (SELECT {', '.join(select_list)} FROM {source})
+                    TO '{tmp_file.replace("'", "''")}' (FORMAT PARQUET, COMPRESSION ZSTD)
+                """).fetchone()[0]
+            
+            if not row_count:
+                os.remove(tmp_file)
+                logger.warning("The market summary query returned no results")
+                return False
+            os.replace(tmp_file, parquet_file)
             
-            logger.info(f"✅ Successfully exported {len(result)} records to {parquet_file}")
+            logger.info(f"✅ Successfully exported {row_count} records to {parquet_file}")
             return True
         except Exception as e:
             logger.error(f"❌ Failed to export market summary: {str(e)}")
             return False
     
-    def store_tokens(self, tokens_data: pd.DataFrame) -> bool:
+    def store_tokens(self, *token_frames: pd.DataFrame) -> bool:
         """
         Store filtered tokens data in master table.
         
+        Each frame is converted to Arrow separately and the batches are inserted
+        in one statement, so callers don't need to pd.concat them first.
+        
         Args:
-            tokens_data: DataFrame containing both futures and equity tokens
+            token_frames: DataFrames of futures, options and equity tokens
             
         Returns:
             bool: True if successful, False otherwise
         """
         try:
-            # Define required columns in correct order
-            required_columns = [
-                'token', 'symbol', 'name', 'expiry', 'strike', 'lotsize',
-                'instrumenttype', 'exch_seg', 'tick_size', 'token_type',
-                'futures_token', 'strike_distance'
-            ]
-            
-            # Select and reorder columns - handle case where strike_distance might not exist
-            # in older code still passing data to this method
-            df_columns = tokens_data.columns.tolist()
-            if 'strike_distance' not in df_columns:
-                tokens_data['strike_distance'] = None
-                logger.warning("⚠️ strike_distance column not found in input data, adding with NULL values")
-            
-            # Select and reorder columns
-            tokens_data = tokens_data[required_columns].copy()
-            
-            # Log sample data before storage
-            logger.info("\nSample data before storage:")
-            logger.info(tokens_data[['symbol', 'token_type', 'expiry', 'futures_token', 'strike_distance']].head())
-            
-            # Clear existing data and insert new
-            self.conn.execute("DELETE FROM token_master")
-            
-            # Insert with explicit column specification
-            self.conn.execute("""
-                INSERT INTO token_master (
-                    token, symbol, name, expiry, strike, lotsize,
-                    instrumenttype, exch_seg, tick_size, token_type,
-                    futures_token, strike_distance, created_at
-                )
-                SELECT 
-                    token, symbol, name, expiry, strike, lotsize,
-                    instrumenttype, exch_seg, tick_size, token_type,
-                    futures_token, strike_distance, CURRENT_TIMESTAMP
-                FROM tokens_data
-            """)
-            
-            # Log row count
-            count = self.conn.execute("SELECT COUNT(*) FROM token_master").fetchone()[0]
-            logger.info(f"✅ Stored {count} tokens in master table")
-            
-            # Get sample data for verification
-            logger.info("\nSample FUTURES data from database:")
-            futures_sample = self.conn.execute("""
-                SELECT token, symbol, name, token_type, futures_token, expiry 
-                FROM token_master 
-                WHERE token_type = 'FUTURES' 
-                LIMIT 3
-            """).fetchall()
-            for row in futures_sample:
-                logger.info(row)
+            tables = []
+            for tokens_data in token_frames:
+                # Only options carry strike_distance; the column is NULL for other token types
+                has_distance = 'strike_distance' in tokens_data.columns
                 
-            logger.info("\nSample EQUITY data from database:")
-            equity_sample = self.conn.execute("""
-                SELECT token, symbol, name, token_type, futures_token, expiry 
-                FROM token_master 
-                WHERE token_type = 'EQUITY' 
-                LIMIT 3
-            """).fetchall()
-            for row in equity_sample:
-                logger.info(row)
+                # Log sample data before storage
+                if logger.isEnabledFor(logging.DEBUG):
+                    sample_columns = ['symbol', 'token_type', 'expiry', 'futures_token', 'strike_distance']
+                    logger.debug("\nSample data before storage:")
+                    logger.debug("%s", tokens_data[sample_columns if has_distance else sample_columns[:-1]].head())
                 
-            # New: Log sample options data to verify strike_distance
-            logger.info("\nSample OPTIONS data from database with strike_distance:")
-            options_sample = self.conn.execute("""
-                SELECT token, symbol, name, token_type, strike, strike_distance 
-                FROM token_master 
-                WHERE token_type = 'OPTIONS' 
-                AND strike_distance IS NOT NULL
-                LIMIT 5
-            """).fetchall()
+                # Convert to Arrow with a fixed schema so DuckDB scans it without type inference.
+                # The schema also selects and orders the required columns, so the caller's
+                # frame is read in place instead of being copied first
+                if has_distance:
+                    table = pa.Table.from_pandas(tokens_data, schema=self.TOKEN_SCHEMA, preserve_index=False)
+                else:
+                    table = pa.Table.from_pandas(tokens_data, schema=self._TOKEN_SCHEMA_NO_DISTANCE, preserve_index=False)
+                    table = table.append_column(self.TOKEN_SCHEMA.field('strike_distance'),
+                                                pa.nulls(table.num_rows, pa.float64()))
+                tables.append(table)
+            
+            # Chunks are stitched together without copying
+            tokens_table = pa.concat_tables(tables)
+            logger.info(f"Ingesting {tokens_table.num_rows} rows into token_master")
+            
+            # Replace the token set atomically: upsert the new rows, then drop tokens that
+            # are no longer listed. Readers never see an empty table, and no deleted key is
+            # re-inserted within the transaction (which DuckDB rejects)
+            self.conn.register("tokens_data", tokens_table)
+            self.conn.execute("BEGIN TRANSACTION")
+            try:
+                # Insert with explicit column specification; older databases have
+                # strike_distance after created_at, so positional append is not safe
+                self.conn.execute("""
+                    INSERT OR REPLACE INTO token_master (
+                        token, symbol, name, expiry, strike, lotsize,
+                        instrumenttype, exch_seg, tick_size, token_type,
+                        futures_token, strike_distance, created_at
+                    )
+                    SELECT 
+                        token, symbol, name, expiry, strike, lotsize,
+                        instrumenttype, exch_seg, tick_size, token_type,
+                        futures_token, strike_distance, CURRENT_TIMESTAMP
+                    FROM tokens_data
+                """)
+                self.conn.execute("""
+                    DELETE FROM token_master
+                    WHERE token NOT IN (SELECT token FROM tokens_data)
+                """)
+                self.conn.execute("COMMIT")
+                self._bump_token_master_version()
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            finally:
+                self.conn.unregister("tokens_data")
             
-            if options_sample:
-                for row in options_sample:
-                    logger.info(row)
+            # Log row count; after the prune the table holds exactly the ingested token set
+            if self._verify_on_write:
+                count = self.conn.execute("SELECT COUNT(*) FROM token_master").fetchone()[0]
             else:
-                # Check if there are options without strike_distance
-                no_distance_count = self.conn.execute("""
-                    SELECT COUNT(*) FROM token_master 
-                    WHERE token_type = 'OPTIONS' 
-                    AND strike_distance IS NULL
-                """).fetchone()[0]
+                count = tokens_table.num_rows
+            logger.info(f"✅ Stored {count} tokens in master table")
+            
+            if self._verify_on_write and logger.isEnabledFor(logging.DEBUG):
+                # Counts and samples for every token type in one query, formatted locally
+                stats = {}
+                samples = {}
+                for row in self.conn.execute(_TOKEN_VERIFICATION_SQL).fetchall():
+                    token_type, total, with_distance = row[:3]
+                    stats[token_type] = (total, with_distance)
+                    if row[3] is not None:
+                        samples.setdefault(token_type, []).append(row[3:])
                 
-                logger.warning(f"⚠️ No options found with strike_distance. {no_distance_count} options have NULL strike_distance.")
+                for token_type in ['FUTURES', 'EQUITY']:
+                    logger.debug(f"\nSample {token_type} data from database:")
+                    for token, symbol, name, futures_token, expiry, _, _ in samples.get(token_type, []):
+                        logger.debug((token, symbol, name, token_type, futures_token, expiry))
                 
-                # Check if there are any strike_distance values at all
-                any_distance = self.conn.execute("""
-                    SELECT COUNT(*) FROM token_master 
-                    WHERE strike_distance IS NOT NULL
-                """).fetchone()[0]
+                options_total, options_with_distance = stats.get('OPTIONS', (0, 0))
                 
-                if any_distance > 0:
-                    some_distances = self.conn.execute("""
-                        SELECT name, strike_distance 
-                        FROM token_master 
-                        WHERE strike_distance IS NOT NULL
-                        GROUP BY name, strike_distance
-                        LIMIT 5
-                    """).fetchall()
-                    logger.info("Some records do have strike_distance values:")
-                    for row in some_distances:
-                        logger.info(row)
+                # New: Log sample options data to verify strike_distance
+                logger.debug("\nSample OPTIONS data from database with strike_distance:")
+                if options_with_distance:
+                    for token, symbol, name, _, _, strike, strike_distance in samples['OPTIONS']:
+                        logger.debug((token, symbol, name, 'OPTIONS', strike, strike_distance))
                 else:
-                    logger.warning("⚠️ No records found with strike_distance values at all.")
+                    no_distance_count = options_total - options_with_distance
+                    logger.warning(f"⚠️ No options found with strike_distance. {no_distance_count} options have NULL strike_distance.")
+                    
+                    # Check if there are any strike_distance values at all
+                    some_distances = [
+                        (name, strike_distance)
+                        for rows in samples.values()
+                        for _, _, name, _, _, _, strike_distance in rows
+                        if strike_distance is not None
+                    ]
+                    if some_distances:
+                        logger.debug("Some records do have strike_distance values:")
+                        for row in some_distances[:5]:
+                            logger.debug(row)
+                    else:
+                        logger.warning("⚠️ No records found with strike_distance values at all.")
                 
             return True
         except Exception as e:
             logger.error(f"❌ Error storing tokens: {str(e)}")
             # Log the DataFrame info for debugging
-            logger.error("\nDataFrame info:")
-            logger.error(f"Columns: {list(tokens_data.columns)}")
-            logger.error(f"Shape: {tokens_data.shape}")
+            for tokens_data in token_frames:
+                logger.error("\nDataFrame info:")
+                logger.error(f"Columns: {list(tokens_data.columns)}")
+                logger.error(f"Shape: {tokens_data.shape}")
             return False
     
     def close(self):
-        """Close database connection."""
+        """Close database connection, the shared connection is closed once no manager uses it."""
+        if self._released:
+            return
+        self._released = True
         self.conn.close()
+        if self.read_only:
+            return
+        
+        with _POOL_LOCK:
+            entry = _POOL.get(self.db_path)
+            if entry is not None:
+                entry['refs'] -= 1
+                if entry['refs'] <= 0:
+                    self._drop_pooled_connection(self.db_path)
+    
+    @property
+    def token_master_version(self) -> int:
+        """Number of token_master rewrites made in this process on this manager's database file."""
+        return _TOKEN_MASTER_VERSIONS.get(self.db_path, 0)
+    
+    def _bump_token_master_version(self) -> None:
+        """Mark token-derived caches of every manager on this database file as stale."""
+        with _POOL_LOCK:
+            _TOKEN_MASTER_VERSIONS[self.db_path] = _TOKEN_MASTER_VERSIONS.get(self.db_path, 0) + 1
     
     def get_latest_token_update_time(self) -> Optional[datetime]:
         """
@@ -380,6 +755,11 @@ class DBManager:
         Returns:
             Optional[datetime]: Timestamp of most recent update or None if no tokens exist
         """
+        # Reuse the memo until token_master is rewritten by any manager of this file
+        version = self.token_master_version
+        if self._latest_token_update is not None and self._latest_token_update[0] == version:
+            return self._latest_token_update[1]
+        
         try:
             result = self.conn.execute("""
                 SELECT MAX(created_at) 
@@ -390,6 +770,7 @@ class DBManager:
             if result[0] is None:
                 return None
                 
+            self._latest_token_update = (version, result[0])
             return result[0]
         except Exception as e:
             logger.error(f"❌ Error retrieving latest token update time: {str(e)}")
@@ -400,30 +781,48 @@ class DBManager:
         Handle corrupted database file by recreating it.
         This happens when the database file is corrupted, which can occur
         after improper shutdowns or direct SQL manipulation outside the API.
+        
+        The file is only recreated when no other manager holds the shared
+        connection; deleting it would leave their cursors on a closed connection.
+        
+        Raises:
+            RuntimeError: If other managers still use the database file
         """
-        try:
-            logger.warning("Attempting to recover by recreating the database...")
+        with _POOL_LOCK:
+            entry = _POOL.get(self.db_path)
+            # self.conn is only set once this manager counted itself in refs
+            own_refs = 1 if hasattr(self, 'conn') else 0
+            other_holders = entry['refs'] - own_refs if entry is not None else 0
+            if other_holders > 0:
+                logger.error(f"❌ Not recreating {self.db_path}: {other_holders} other managers still use it")
+                if own_refs:
+                    self.close()
+                raise RuntimeError(f"Database file {self.db_path} is corrupted and in use by other managers")
             
-            # Close any existing connection
             try:
-                if hasattr(self, 'conn') and self.conn:
-                    self.conn.close()
-            except:
-                pass
-                
-            # Remove the corrupted file if it exists
-            if os.path.exists(self.db_path):
-                logger.warning(f"Removing corrupted database file: {self.db_path}")
-                os.remove(self.db_path)
+                logger.warning("Attempting to recover by recreating the database...")
                 
-            # Create a fresh connection
-            logger.info("Creating new database file...")
-            self.conn = duckdb.connect(self.db_path)
-            self._init_tables()
-            logger.info("✅ Database recovery successful")
-        except Exception as e:
-            logger.error(f"❌ Failed to recover database: {str(e)}")
-            raise
+                # Close any existing connection
+                try:
+                    if hasattr(self, 'conn') and self.conn:
+                        self.conn.close()
+                except:
+                    pass
+                self._drop_pooled_connection(self.db_path)
+                _SCHEMA_INITIALIZED.discard(self.db_path)
+                    
+                # Remove the corrupted file if it exists
+                if os.path.exists(self.db_path):
+                    logger.warning(f"Removing corrupted database file: {self.db_path}")
+                    os.remove(self.db_path)
+                    
+                # Create a fresh connection
+                logger.info("Creating new database file...")
+                self._acquire_connection()
+                logger.info("✅ Database recovery successful")
+            except Exception as e:
+                logger.error(f"❌ Failed to recover database: {str(e)}")
+                raise
             
     def truncate_tables(self) -> bool:
         """
@@ -434,12 +833,71 @@ class DBManager:
         """
         try:
             self.conn.execute("TRUNCATE TABLE token_master")
+            self._bump_token_master_version()
             logger.info("✅ All tables truncated")
             return True
         except Exception as e:
             logger.error(f"❌ Error truncating tables: {str(e)}")
             return False
             
+    def _build_historical_table(self, token: str, name: str, data: List[Dict[str, Any]]) -> Optional[pa.Table]:
+        """
+        Convert raw historical candles for one token into an insertable Arrow table.
+        
+        Args:
+            token: Symbol token
+            name: Name of the equity token
+            data: List of historical data records
+            
+        Returns:
+            Optional[pa.Table]: Parsed rows, None if the data could not be parsed
+        """
+        # Angel One API typically returns data as:
+        # [timestamp, open, high, low, close, volume]
+        rows = np.asarray(data, dtype=object)
+        if rows.ndim != 2:
+            # Ragged input, keep only records that carry all six fields
+            rows = np.asarray([row[:6] for row in data if len(row) >= 6], dtype=object)
+        if rows.ndim != 2 or rows.shape[1] < 6:
+            return None
+        
+        rows = rows[:, :6]
+        if not len(rows):
+            return None
+        
+        # One typed NumPy cast per column; DuckDB scans the resulting Arrow buffers zero-copy.
+        # from_pandas=True turns missing values (None/NaN/NaT) into SQL NULLs rather than NaN.
+        # Timestamps are parsed in one vectorized pass and stored as naive UTC like DuckDB's string cast
+        timestamps = pd.to_datetime(rows[:, 0], utc=True, cache=True).tz_localize(None).values
+        prices = [pa.array(rows[:, i].astype(np.float64), from_pandas=True) for i in range(1, 5)]
+        # Fractional volumes are rounded to whole shares instead of being truncated
+        volume = pa.array(np.round(rows[:, 5].astype(np.float64)), from_pandas=True).cast(pa.int64())
+        return pa.Table.from_arrays([
+            pa.array([token] * len(rows), pa.string()),
+            pa.array([name] * len(rows), pa.string()),
+            pa.array(timestamps, pa.timestamp('us'), from_pandas=True),
+            *prices,
+            volume,
+        ], schema=self.HISTORICAL_SCHEMA)
+    
+    def _historical_table_has_pk(self) -> bool:
+        """
+        Check whether historical_data was created with its primary key.
+        
+        The table shape is fixed when the database is first created, so the
+        answer is cached for the lifetime of the manager.
+        
+        Returns:
+            bool: True if ON CONFLICT upserts can be used
+        """
+        if self._historical_has_pk is None:
+            self._historical_has_pk = self.conn.execute("""
+                SELECT COUNT(*) > 0
+                FROM duckdb_constraints()
+                WHERE table_name = 'historical_data' AND constraint_type = 'PRIMARY KEY'
+            """).fetchone()[0]
+        return self._historical_has_pk
+    
     def store_historical_data(self, token: str, name: str, data: List[Dict[str, Any]]) -> bool:
         """
         Store historical data for an equity token.
@@ -452,80 +910,208 @@ class DBManager:
         Returns:
             bool: True if successful, False otherwise
         """
+        return token in self.store_historical_data_bulk({token: (name, data)})
+    
+    def store_historical_data_bulk(self, mapping: Dict[str, Tuple[str, List[Dict[str, Any]]]]) -> Set[str]:
+        """
+        Store historical data for several equity tokens with a single insert.
+        
+        Args:
+            mapping: Token -> (name, list of historical data records)
+            
+        Returns:
+            Set[str]: Tokens whose data was stored (tokens without candles count as stored).
+                Tokens that failed to parse are left out, and the set is empty if the insert failed
+        """
+        if len(mapping) == 1:
+            token, (name, _) = next(iter(mapping.items()))
+            label = f"{name} ({token})"
+        else:
+            label = f"{len(mapping)} tokens"
+        
         try:
             # Table is now created in _init_tables, no need to create it here
+            tables = []
+            stored = set()
+            for token, (name, data) in mapping.items():
+                if not data:
+                    logger.warning(f"No historical data to store for {name} ({token})")
+                    stored.add(token)
+                    continue
+                table = self._build_historical_table(token, name, data)
+                if table is None:
+                    logger.warning(f"Failed to parse historical data for {name} ({token})")
+                    continue
+                tables.append(table)
+                stored.add(token)
+            
+            if not tables:
+                return stored
+            
+            # Chunks are stitched together without copying
+            batch = pa.concat_tables(tables)
+            self._insert_historical_batch(batch)
             
-            # Format data for insertion
-            if not data:
-                logger.warning(f"No historical data to store for {name} ({token})")
+            logger.info(f"✅ Successfully stored {batch.num_rows} historical records for {label}")
+            return stored
+            
+        except Exception as e:
+            logger.error(f"❌ Error storing historical data for {label}: {str(e)}")
+            return set()
+    
+    def _insert_historical_batch(self, batch: pa.Table) -> None:
+        """
+        Write an Arrow batch of parsed candles into historical_data.
+        
+        Args:
+            batch: Rows in HISTORICAL_SCHEMA
+        """
+        self.conn.register('historical_batch', batch)
+        try:
+            if self._historical_table_has_pk():
+                # Merge the batch with conflict resolution in one statement
+                self.conn.execute("""
+                    INSERT INTO historical_data 
+                    (token, symbol_name, timestamp, open, high, low, close, volume)
+                    SELECT token, symbol_name, timestamp, open, high, low, close, volume
+                    FROM historical_batch
+                    ON CONFLICT(token, timestamp) DO UPDATE SET
+                        symbol_name = EXCLUDED.symbol_name,
+                        open = EXCLUDED.open,
+                        high = EXCLUDED.high,
+                        low = EXCLUDED.low,
+                        close = EXCLUDED.close,
+                        volume = EXCLUDED.volume
+                """)
+            else:
+                # No primary key to conflict on: replace re-fetched candles in one transaction
+                self.conn.execute("BEGIN TRANSACTION")
+                try:
+                    self.conn.execute("""
+                        DELETE FROM historical_data
+                        USING historical_batch
+                        WHERE historical_data.token = historical_batch.token
+                          AND historical_data.timestamp = historical_batch.timestamp
+                    """)
+                    self.conn.execute("INSERT INTO historical_data BY NAME SELECT * FROM historical_batch")
+                    self.conn.execute("COMMIT")
+                except Exception:
+                    self.conn.execute("ROLLBACK")
+                    raise
+        finally:
+            self.conn.unregister('historical_batch')
+    
+    def archive_historical_data(self, archive_dir: Optional[str] = None, keep_days: Optional[int] = None) -> bool:
+        """
+        Move historical candles older than keep_days into month-partitioned Parquet files.
+        
+        Rows are written under archive_dir/year=YYYY/month=M/ with a unique file name per
+        run, so archiving into an existing month adds a file instead of overwriting it.
+        The historical_data_all view unions the archive with the live table; filters on
+        its year/month columns only read the matching partitions.
+        
+        Args:
+            archive_dir: Optional archive directory, uses config value if not provided
+            keep_days: Optional number of days kept in historical_data, uses config value if not provided
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        # Absolute, so the view definition still resolves when the database is opened elsewhere
+        archive_dir = os.path.abspath(archive_dir or config.get('database', 'historical_archive', 'path'))
+        if keep_days is None:
+            keep_days = config.get('database', 'historical_archive', 'keep_days')
+        cutoff = datetime.now() - timedelta(days=keep_days)
+        
+        try:
+            archive_count = self.conn.execute(
+                "SELECT COUNT(*) FROM historical_data WHERE timestamp < ?", [cutoff]
+            ).fetchone()[0]
+            if not archive_count:
+                logger.info(f"No historical data older than {cutoff:%Y-%m-%d} to archive")
                 return True
+            
+            os.makedirs(archive_dir, exist_ok=True)
+            archive_path = archive_dir.replace("'", "''")
+            
+            # Parquet files are not covered by the transaction: COPY writes them to a run-specific
+            # staging directory outside the archive glob, and they are only moved into the archive
+            # right before COMMIT. On any failure the files this run wrote are removed again
+            staging_dir = f"{archive_dir}.staging-{uuid.uuid4().hex}"
+            os.makedirs(staging_dir)
+            moved = []
+            self.conn.execute("BEGIN TRANSACTION")
+            try:
+                self.conn.execute(f"""
+                    COPY (
+                        SELECT *, year(timestamp) AS year, month(timestamp) AS month
+                        FROM historical_data
+                        WHERE timestamp < ?
+                    ) TO '{staging_dir.replace("'", "''")}' (
+                        FORMAT PARQUET, PARTITION_BY (year, month),
+                        OVERWRITE_OR_IGNORE, FILENAME_PATTERN 'part_{{uuid}}'
+                    )
+                """, [cutoff])
+                self.conn.execute("DELETE FROM historical_data WHERE timestamp < ?", [cutoff])
                 
-            # Convert data to dataframe for easier insertion
-            # Angel One API typically returns data as:
-            # [timestamp, open, high, low, close, volume]
-            records = []
-            for record in data:
-                if len(record) >= 6:  # Ensure record has all required fields
-                    records.append({
-                        'token': token,
-                        'symbol_name': name,
-                        'timestamp': record[0],  # timestamp
-                        'open': record[1],       # open
-                        'high': record[2],       # high
-                        'low': record[3],        # low
-                        'close': record[4],      # close
-                        'volume': record[5]      # volume
-                    })
-            
-            if not records:
-                logger.warning(f"Failed to parse historical data for {name} ({token})")
-                return False
+                for root, _, files in os.walk(staging_dir):
+                    target_dir = os.path.join(archive_dir, os.path.relpath(root, staging_dir))
+                    os.makedirs(target_dir, exist_ok=True)
+                    for file_name in files:
+                        target = os.path.join(target_dir, file_name)
+                        os.replace(os.path.join(root, file_name), target)
+                        moved.append(target)
                 
-            # Convert to DataFrame and insert
-            df = pd.DataFrame(records)
-            
-            # Insert data with conflict resolution 
-            self.conn.execute("""
-                INSERT INTO historical_data 
-                (token, symbol_name, timestamp, open, high, low, close, volume)
-                SELECT token, symbol_name, timestamp, open, high, low, close, volume
-                FROM df
-                ON CONFLICT(token, timestamp) DO UPDATE SET
-                    symbol_name = EXCLUDED.symbol_name,
-                    open = EXCLUDED.open,
-                    high = EXCLUDED.high,
-                    low = EXCLUDED.low,
-                    close = EXCLUDED.close,
-                    volume = EXCLUDED.volume
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                for target in moved:
+                    try:
+                        os.remove(target)
+                    except OSError:
+                        logger.error(f"❌ Could not remove archive file {target} after a failed archive run")
+                raise
+            finally:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+            
+            self.conn.execute(f"""
+                CREATE OR REPLACE VIEW historical_data_all AS
+                SELECT * FROM read_parquet('{archive_path}/**/*.parquet', hive_partitioning = 1)
+                UNION ALL BY NAME
+                SELECT *, year(timestamp) AS year, month(timestamp) AS month
+                FROM historical_data
             """)
             
-            logger.info(f"✅ Successfully stored {len(records)} historical records for {name} ({token})")
+            logger.info(f"✅ Archived {archive_count} historical records older than {cutoff:%Y-%m-%d} to {archive_dir}")
             return True
-            
         except Exception as e:
-            logger.error(f"❌ Error storing historical data for {name} ({token}): {str(e)}")
+            logger.error(f"❌ Error archiving historical data: {str(e)}")
             return False
     
-    def get_technical_indicators_summary(self, token=None, symbol=None):
+    def get_technical_indicators_summary(self, token=None, symbol=None, as_arrow: bool = False):
         """
         Get the technical indicators summary in wide format.
         
         Args:
             token: Optional token to filter by
             symbol: Optional symbol name to filter by (partial match)
+            as_arrow: Return a pyarrow.Table instead of converting to pandas
             
         Returns:
-            DataFrame with the technical indicators summary
+            DataFrame (or pyarrow.Table if as_arrow) with the technical indicators summary
         """
         try:
             query = "SELECT * FROM technical_indicators_summary"
             where_clauses = []
+            params = []
             
             if token:
-                where_clauses.append(f"token = '{token}'")
+                where_clauses.append("token = ?")
+                params.append(token)
             
             if symbol:
-                where_clauses.append(f"symbol_name LIKE '%{symbol}%'")
+                where_clauses.append("symbol_name LIKE ?")
+                params.append(f"%{symbol}%")
             
             if where_clauses:
                 query += " WHERE " + " AND ".join(where_clauses)
@@ -533,16 +1119,16 @@ class DBManager:
             # Add order by
             query += " ORDER BY symbol_name"
             
-            # Execute and return as dataframe
-            result = self.conn.execute(query).fetchdf()
+            # Fetch as Arrow; pandas conversion only happens for callers that want a DataFrame
+            result = self.fetch_arrow(query, params)
             
-            if result.empty:
+            if result.num_rows == 0:
                 logger.warning("No technical indicators summary data found")
             else:
-                logger.info(f"Retrieved {len(result)} records from technical_indicators_summary")
+                logger.info(f"Retrieved {result.num_rows} records from technical_indicators_summary")
             
-            return result
+            return result if as_arrow else result.to_pandas()
             
         except Exception as e:
             logger.error(f"❌ Error retrieving technical indicators summary: {str(e)}")
-            return pd.DataFrame() 
\ No newline at end of file
+            return pa.table({}) if as_arrow else pd.DataFrame() 
\ No newline at end of file
@@ -4,12 +4,11 @@ Handles fetching and processing spot equity price data.
 """
 
 import pandas as pd
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from logzero import logger
-import time
 
-from src.angel_one_connector import AngelOneConnector
+from src.angel_one_connector import AngelOneConnector, call_concurrently
 from src.db_manager import DBManager
 from src.config_manager import config
 
@@ -74,7 +73,8 @@ class EquityMarketDataManager:
         logger.info(f"Date range for equity market data: {from_date} to {to_date}")
         return from_date, to_date
     
-    def fetch_equity_market_data(self, token: str, exchange: str, name: str, interval: str = "ONE_DAY") -> Optional[Dict[str, Any]]:
+    def fetch_equity_market_data(self, token: str, exchange: str, name: str, interval: str = "ONE_DAY",
+                                 date_params: Optional[Tuple[str, str]] = None) -> Optional[Dict[str, Any]]:
         """
         Fetch market data for a single equity token.
         
@@ -83,11 +83,12 @@ class EquityMarketDataManager:
             exchange: Exchange segment (NSE)
             name: Name of the equity token (for logging)
             interval: Data interval (ONE_MINUTE, ONE_DAY, etc.) Default: ONE_DAY
+            date_params: Optional (fromdate, todate) pair, computed with _get_date_params() if not provided
             
         Returns:
             Optional[Dict[str, Any]]: Market data response or None if failed
         """
-        from_date, to_date = self._get_date_params()
+        from_date, to_date = date_params or self._get_date_params()
         
         params = {
             "exchange": exchange,
@@ -98,11 +99,11 @@ class EquityMarketDataManager:
         }
         
         try:
-            logger.info(f"Fetching equity market data for {name} ({token}) with {interval} interval")
+            logger.debug("Fetching equity market data for %s (%s) with %s interval", name, token, interval)
             market_data = self.connector.api.getCandleData(params)
             
             if market_data.get('status'):
-                logger.info(f"✅ Successfully fetched {len(market_data.get('data', []))} records for {name}")
+                logger.debug("Fetched %d records for %s", len(market_data.get('data', [])), name)
                 return market_data
             else:
                 logger.error(f"❌ Failed to fetch equity market data for {name}: {market_data.get('message', 'Unknown error')}")
@@ -112,6 +113,29 @@ class EquityMarketDataManager:
             logger.error(f"❌ Error fetching equity market data for {name}: {str(e)}")
             return None
     
+    def fetch_equity_market_data_many(self, tokens: List[Tuple[str, str, str]], interval: str = "ONE_DAY") -> List[Optional[Dict[str, Any]]]:
+        """
+        Fetch market data for several equity tokens with bounded concurrency.
+        
+        Up to equity_market_data.rate_limiting.max_concurrent requests are in flight,
+        and request starts stay request_delay apart as in the sequential loop.
+        
+        Args:
+            tokens: (token, exchange, name) tuples
+            interval: Data interval (ONE_MINUTE, ONE_DAY, etc.)
+            
+        Returns:
+            List[Optional[Dict[str, Any]]]: Response (or None) for each token, in input order
+        """
+        max_concurrent = config.get('equity_market_data', 'rate_limiting', 'max_concurrent') or 1
+        request_delay = config.get('equity_market_data', 'rate_limiting', 'request_delay') or 0
+        # Every token shares the same date range, compute it once
+        date_params = self._get_date_params()
+        return call_concurrently(
+            lambda row: self.fetch_equity_market_data(*row, interval=interval, date_params=date_params),
+            tokens, max_concurrent, request_delay
+        )
+    
     def process_equity_market_data(self, limit: int = 5, interval: str = None) -> Dict[str, Any]:
         """
         Process market data for equity tokens.
@@ -139,14 +163,11 @@ class EquityMarketDataManager:
             "data": {}
         }
         
-        for _, row in equity_tokens.iterrows():
-            token = row['token']
-            exchange = row['exch_seg']
-            name = row['name']
-            
-            # Fetch market data for this token
-            market_data = self.fetch_equity_market_data(token, exchange, name, interval=interval)
-            
+        # Fetch market data for all tokens concurrently
+        token_rows = list(equity_tokens[['token', 'exch_seg', 'name']].itertuples(index=False, name=None))
+        responses = self.fetch_equity_market_data_many(token_rows, interval=interval)
+        
+        for (token, exchange, name), market_data in zip(token_rows, responses):
             if market_data and market_data.get('status'):
                 data = market_data.get('data', [])
                 results["success"] += 1
@@ -157,10 +178,6 @@ class EquityMarketDataManager:
                 }
             else:
                 results["errors"] += 1
-            
-            # Add a small delay to avoid API rate limits
-            request_delay = config.get('equity_market_data', 'rate_limiting', 'request_delay')
-            time.sleep(request_delay)
         
         logger.info(f"✅ Equity market data processing complete. Success: {results['success']}, Errors: {results['errors']}")
         return results
@@ -192,34 +209,31 @@ class EquityMarketDataManager:
             "data": {}
         }
         
-        for _, row in equity_tokens.iterrows():
-            token = row['token']
-            exchange = row['exch_seg']
-            name = row['name']
-            
-            # Fetch market data for this token
-            market_data = self.fetch_equity_market_data(token, exchange, name, interval=interval)
-            
+        # Fetch market data for all tokens concurrently
+        token_rows = list(equity_tokens[['token', 'exch_seg', 'name']].itertuples(index=False, name=None))
+        responses = self.fetch_equity_market_data_many(token_rows, interval=interval)
+        
+        fetched = {}
+        for (token, exchange, name), market_data in zip(token_rows, responses):
             if market_data and market_data.get('status'):
-                data = market_data.get('data', [])
-                
-                # Store the data in the database
-                if self.db_manager.store_historical_data(token, name, data):
-                    results["success"] += 1
-                    results["data"][token] = {
-                        "name": name,
-                        "records": len(data),
-                        "sample": data[:2]  # Log first 2 records as sample
-                    }
-                else:
-                    results["errors"] += 1
-                    logger.error(f"Failed to store equity market data for {name} ({token})")
+                fetched[token] = (name, market_data.get('data', []))
             else:
                 results["errors"] += 1
-            
-            # Add a small delay to avoid API rate limits
-            request_delay = config.get('equity_market_data', 'rate_limiting', 'request_delay')
-            time.sleep(request_delay)
+        
+        # Store every fetched token with a single insert
+        if fetched:
+            stored = self.db_manager.store_historical_data_bulk(fetched)
+            results["success"] += len(stored)
+            results["errors"] += len(fetched) - len(stored)
+            for token in stored:
+                name, data = fetched[token]
+                results["data"][token] = {
+                    "name": name,
+                    "records": len(data),
+                    "sample": data[:2]  # Log first 2 records as sample
+                }
+            if len(stored) < len(fetched):
+                logger.error(f"Failed to store equity market data for {len(fetched) - len(stored)} tokens")
         
         logger.info(f"✅ Equity market data fetch and store complete. Success: {results['success']}, Errors: {results['errors']}")
         return results
@@ -241,7 +255,7 @@ class EquityMarketDataManager:
             if interval is None:
                 interval = config.get('equity_market_data', 'default_interval')
                 
-            logger.info(f"Fetching {interval} data for {name} ({token})...")
+            logger.debug("Fetching %s data for %s (%s)...", interval, name, token)
             
             # Fetch data
             response = self.fetch_equity_market_data(token, exchange, name, interval)
@@ -261,7 +275,7 @@ class EquityMarketDataManager:
             if self.db_manager:
                 success = self.db_manager.store_historical_data(token, name, data)
                 if success:
-                    logger.info(f"Successfully stored {len(data)} records for {name} ({token})")
+                    logger.debug("Stored %d records for %s (%s)", len(data), name, token)
                     return {
                         'success': True,
                         'records': len(data),
@@ -3,17 +3,85 @@ Real-time market data manager for Angel One API.
 Handles fetching and processing real-time price data for spot, futures, and options.
 """
 
+import logging
 import pandas as pd
-from typing import List, Dict, Any, Optional, Tuple
-from datetime import datetime
+import pyarrow as pa
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from logzero import logger
 import time
 import json
 
-from src.angel_one_connector import AngelOneConnector
+from src.angel_one_connector import AngelOneConnector, call_concurrently
 from src.db_manager import DBManager
 from src.config_manager import config
 
+try:
+    # orjson serializes the depth ladders several times faster than the stdlib encoder
+    import orjson
+    
+    def _dump_json(value: Any) -> str:
+        return orjson.dumps(value).decode()
+except ImportError:
+    def _dump_json(value: Any) -> str:
+        return json.dumps(value)
+
+# API quote field -> realtime_market_data column
+_REALTIME_COLUMNS = {
+    'exchange': 'exchange',
+    'tradingSymbol': 'trading_symbol',
+    'symbolToken': 'symbol_token',
+    'ltp': 'ltp',
+    'open': 'open',
+    'high': 'high',
+    'low': 'low',
+    'close': 'close',
+    'lastTradeQty': 'last_trade_qty',
+    'exchFeedTime': 'exch_feed_time',
+    'exchTradeTime': 'exch_trade_time',
+    'netChange': 'net_change',
+    'percentChange': 'percent_change',
+    'avgPrice': 'avg_price',
+    'tradeVolume': 'trade_volume',
+    'opnInterest': 'opn_interest',
+    'lowerCircuit': 'lower_circuit',
+    'upperCircuit': 'upper_circuit',
+    'totBuyQuan': 'tot_buy_quan',
+    'totSellQuan': 'tot_sell_quan',
+    '52WeekLow': 'week_low_52',
+    '52WeekHigh': 'week_high_52',
+}
+
+# Arrow schema of a realtime batch. Integer columns are staged as float64 and
+# cast by the INSERT, so fractional quantities round instead of truncating.
+_REALTIME_SCHEMA = pa.schema([
+    ('exchange', pa.string()),
+    ('trading_symbol', pa.string()),
+    ('symbol_token', pa.string()),
+    ('ltp', pa.float64()),
+    ('open', pa.float64()),
+    ('high', pa.float64()),
+    ('low', pa.float64()),
+    ('close', pa.float64()),
+    ('last_trade_qty', pa.float64()),
+    ('exch_feed_time', pa.timestamp('us')),
+    ('exch_trade_time', pa.timestamp('us')),
+    ('net_change', pa.float64()),
+    ('percent_change', pa.float64()),
+    ('avg_price', pa.float64()),
+    ('trade_volume', pa.float64()),
+    ('opn_interest', pa.float64()),
+    ('lower_circuit', pa.float64()),
+    ('upper_circuit', pa.float64()),
+    ('tot_buy_quan', pa.float64()),
+    ('tot_sell_quan', pa.float64()),
+    ('week_low_52', pa.float64()),
+    ('week_high_52', pa.float64()),
+    ('depth_json', pa.string())
+])
+
+# Exchange timestamps look like '21-Feb-2025 15:29:59'
+_EXCHANGE_TIME_FORMAT = '%d-%b-%Y %H:%M:%S'
+
 class RealtimeMarketDataManager:
     """Manages fetching and processing of real-time market data."""
     
@@ -40,8 +108,55 @@ class RealtimeMarketDataManager:
         max_tokens = config.get('realtime_market_data', 'max_tokens_per_request')
         self.max_tokens_per_request = 50 if max_tokens is None else max_tokens
         
+        max_concurrent = config.get('realtime_market_data', 'max_concurrent_requests')
+        self.max_concurrent_requests = 3 if max_concurrent is None else max(1, max_concurrent)
+        
         mode = config.get('realtime_market_data', 'mode')
         self.mode = "FULL" if mode is None else mode
+        
+        token_cache_ttl = config.get('realtime_market_data', 'token_cache_ttl')
+        self.token_cache_ttl = 300 if token_cache_ttl is None else token_cache_ttl
+        
+        # Token lists keyed by (token_type, limit) -> (loaded_at, config_version, token_master_version, rows)
+        self._token_cache: Dict[Tuple[str, Optional[int]], Tuple[float, int, int, pd.DataFrame]] = {}
+    
+    def _get_cached_tokens(self, token_type: str, limit: Optional[int],
+                           loader: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Get token rows from the in-memory cache, reloading them once the TTL expires.
+        
+        The token universe rarely changes intraday, so refresh cycles reuse the rows
+        loaded by a previous cycle instead of querying token_master every time.
+        Cached rows are dropped when the configuration is reloaded or token_master is
+        rewritten by any DBManager of the same database file in this process.
+        
+        Args:
+            token_type: Token type(s) of the cached rows, comma-separated (e.g. EQUITY or EQUITY,OPTIONS)
+            limit: Limit the rows were loaded with
+            loader: Callable that loads the rows from the database
+            
+        Returns:
+            pd.DataFrame: Copy of the cached token rows
+        """
+        key = (token_type, limit)
+        now = time.monotonic()
+        token_version = getattr(self.db_manager, 'token_master_version', 0)
+        
+        cached = self._token_cache.get(key)
+        if cached is not None:
+            loaded_at, config_version, cached_token_version, rows = cached
+            if (now - loaded_at < self.token_cache_ttl and config_version == config.version
+                    and cached_token_version == token_version):
+                logger.debug(f"Using cached {token_type} tokens ({len(rows)} rows)")
+                return rows.copy()
+        
+        rows = loader()
+        
+        # Don't cache failed or empty lookups so the next cycle retries the query
+        if not rows.empty:
+            self._token_cache[key] = (now, config.version, token_version, rows)
+            return rows.copy()
+        return rows
     
     def get_equity_tokens(self, limit: Optional[int] = None) -> pd.DataFrame:
         """
@@ -53,22 +168,7 @@ class RealtimeMarketDataManager:
         Returns:
             pd.DataFrame: DataFrame with equity token information
         """
-        try:
-            query = """
-                SELECT token, name, exch_seg
-                FROM token_master
-                WHERE token_type = 'EQUITY'
-            """
-            
-            if limit is not None:
-                query += f" LIMIT {limit}"
-                
-            result = self.db_manager.conn.execute(query).fetchdf()
-            logger.info(f"Retrieved {len(result)} equity tokens from database")
-            return result
-        except Exception as e:
-            logger.error(f"Error retrieving equity tokens: {str(e)}")
-            return pd.DataFrame()
+        return self.get_tokens(['EQUITY'], limit)
     
     def get_futures_tokens(self, limit: Optional[int] = None) -> pd.DataFrame:
         """
@@ -80,22 +180,7 @@ class RealtimeMarketDataManager:
         Returns:
             pd.DataFrame: DataFrame with futures token information
         """
-        try:
-            query = """
-                SELECT token, name, exch_seg
-                FROM token_master
-                WHERE token_type = 'FUTURES'
-            """
-            
-            if limit is not None:
-                query += f" LIMIT {limit}"
-                
-            result = self.db_manager.conn.execute(query).fetchdf()
-            logger.info(f"Retrieved {len(result)} futures tokens from database")
-            return result
-        except Exception as e:
-            logger.error(f"Error retrieving futures tokens: {str(e)}")
-            return pd.DataFrame()
+        return self.get_tokens(['FUTURES'], limit)
     
     def get_options_tokens(self, limit: Optional[int] = None) -> pd.DataFrame:
         """
@@ -107,35 +192,53 @@ class RealtimeMarketDataManager:
         Returns:
             DataFrame containing tokens
         """
+        return self.get_tokens(['OPTIONS'], limit)
+    
+    def get_tokens(self, token_types: List[str], limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Get tokens of one or more types with a single query.
+        
+        Args:
+            token_types: Token types to fetch (EQUITY, FUTURES, OPTIONS)
+            limit: Maximum number of tokens per type (None for all)
+            
+        Returns:
+            pd.DataFrame: token_master rows ordered by type, name, strike and expiry
+        """
+        key = ','.join(token_types)
+        return self._get_cached_tokens(key, limit, lambda: self._load_tokens(token_types, limit))
+    
+    def _load_tokens(self, token_types: List[str], limit: Optional[int] = None) -> pd.DataFrame:
+        """Load tokens of the given types from token_master."""
         try:
             if not self.db_manager:
                 logger.error("No database manager available")
                 return pd.DataFrame()
             
-            # Query options tokens
             query = """
                 SELECT * FROM token_master
-                WHERE token_type = 'OPTIONS'
-                ORDER BY name, strike, expiry
+                WHERE list_contains(?, token_type)
             """
+            params = [token_types]
             
+            # Per-type limit, so a multi-type request keeps each type's share
             if limit is not None:
-                query += f" LIMIT {limit}"
+                query += " QUALIFY row_number() OVER (PARTITION BY token_type ORDER BY name, strike, expiry) <= ?"
+                params.append(limit)
+            query += " ORDER BY token_type, name, strike, expiry"
             
-            # Execute query
-            tokens_df = self.db_manager.conn.execute(query).fetchdf()
+            tokens_df = self.db_manager.conn.execute(query, params).fetchdf()
             
-            logger.info(f"Retrieved {len(tokens_df)} options tokens from database")
+            logger.info(f"Retrieved {len(tokens_df)} {'/'.join(token_types).lower()} tokens from database")
             
             # Debug info about the dataframe structure
             if not tokens_df.empty:
-                logger.debug(f"Options dataframe columns: {tokens_df.columns.tolist()}")
-                logger.debug(f"Sample options token row: {tokens_df.iloc[0].to_dict()}")
+                logger.debug(f"Tokens dataframe columns: {tokens_df.columns.tolist()}")
             
             return tokens_df
             
         except Exception as e:
-            logger.error(f"Error retrieving options tokens: {str(e)}")
+            logger.error(f"Error retrieving {'/'.join(token_types).lower()} tokens: {str(e)}")
             return pd.DataFrame()
     
     def prepare_exchange_tokens(self, tokens_df: pd.DataFrame) -> Dict[str, List[str]]:
@@ -148,18 +251,8 @@ class RealtimeMarketDataManager:
         Returns:
             Dict[str, List[str]]: Dictionary with exchange segments as keys and token lists as values
         """
-        exchange_tokens = {}
-        
-        for _, row in tokens_df.iterrows():
-            exchange = row['exch_seg']
-            token = row['token']
-            
-            if exchange not in exchange_tokens:
-                exchange_tokens[exchange] = []
-                
-            exchange_tokens[exchange].append(token)
-        
-        return exchange_tokens
+        # One groupby instead of a Python loop; first-seen exchange and token order is kept
+        return tokens_df.groupby('exch_seg', sort=False)['token'].apply(list).to_dict()
     
     def batch_tokens(self, exchange_tokens: Dict[str, List[str]]) -> List[Dict[str, List[str]]]:
         """
@@ -171,32 +264,16 @@ class RealtimeMarketDataManager:
         Returns:
             List[Dict[str, List[str]]]: List of exchange token dictionaries, each respecting the API limit
         """
-        batches = []
-        current_batch = {}
-        current_count = 0
-        
-        for exchange, tokens in exchange_tokens.items():
-            # Process tokens for this exchange
-            exchange_batches = [tokens[i:i + self.max_tokens_per_request] 
-                               for i in range(0, len(tokens), self.max_tokens_per_request)]
-            
-            for token_batch in exchange_batches:
-                if current_count + len(token_batch) <= self.max_tokens_per_request:
-                    # Add to current batch
-                    if exchange not in current_batch:
-                        current_batch[exchange] = []
-                    current_batch[exchange].extend(token_batch)
-                    current_count += len(token_batch)
-                else:
-                    # Start a new batch
-                    if current_batch:
-                        batches.append(current_batch)
-                    current_batch = {exchange: token_batch}
-                    current_count = len(token_batch)
+        # Flatten once, then cut fixed-size slices; an exchange may span two batches so
+        # every batch except the last is full
+        pairs = [(exchange, token) for exchange, tokens in exchange_tokens.items() for token in tokens]
         
-        # Add the last batch if not empty
-        if current_batch:
-            batches.append(current_batch)
+        batches = []
+        for i in range(0, len(pairs), self.max_tokens_per_request):
+            batch = {}
+            for exchange, token in pairs[i:i + self.max_tokens_per_request]:
+                batch.setdefault(exchange, []).append(token)
+            batches.append(batch)
         
         logger.info(f"Split tokens into {len(batches)} batches")
         return batches
@@ -220,12 +297,12 @@ class RealtimeMarketDataManager:
                     return None
             
             # Make the API call
-            logger.info(f"Fetching real-time market data for {sum(len(tokens) for tokens in exchange_tokens.values())} tokens")
+            logger.debug("Fetching real-time market data for %d tokens", sum(len(tokens) for tokens in exchange_tokens.values()))
             response = self.connector.api.getMarketData(self.mode, exchange_tokens)
             
             # Check response
             if response.get('status'):
-                logger.info("Successfully fetched real-time market data")
+                logger.debug("Successfully fetched real-time market data")
                 return response
             else:
                 logger.error(f"Failed to fetch real-time market data: {response.get('message', 'Unknown error')}")
@@ -235,6 +312,22 @@ class RealtimeMarketDataManager:
             logger.error(f"Error fetching real-time market data: {str(e)}")
             return None
     
+    def fetch_realtime_market_data_batches(self, batches: List[Dict[str, List[str]]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Fetch several token batches with up to max_concurrent_requests calls in flight.
+        
+        Request starts stay at least rate_limit_delay apart, so the API rate limit is
+        kept while slow responses overlap instead of queuing behind each other.
+        
+        Args:
+            batches: Exchange token dictionaries, e.g. from batch_tokens()
+            
+        Returns:
+            List[Optional[Dict[str, Any]]]: Response (or None) for each batch, in batch order
+        """
+        return call_concurrently(self.fetch_realtime_market_data, batches,
+                                 self.max_concurrent_requests, self.rate_limit_delay)
+    
     def process_market_data_response(self, response: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         """
         Process market data response.
@@ -248,7 +341,7 @@ class RealtimeMarketDataManager:
         fetched = response.get('data', {}).get('fetched', [])
         unfetched = response.get('data', {}).get('unfetched', [])
         
-        logger.info(f"Processed market data response: {len(fetched)} fetched, {len(unfetched)} unfetched")
+        logger.debug("Processed market data response: %d fetched, %d unfetched", len(fetched), len(unfetched))
         return fetched, unfetched
     
     def store_realtime_market_data(self, market_data: List[Dict[str, Any]]) -> bool:
@@ -268,61 +361,46 @@ class RealtimeMarketDataManager:
             
             # Table is now created in DBManager._init_tables(), so we don't need to create it here
             
-            # Process and insert each record
-            for record in market_data:
-                # Convert depth to JSON string
-                depth_json = json.dumps(record.get('depth', {}))
-                
-                # Parse timestamps
-                exch_feed_time = datetime.strptime(record.get('exchFeedTime', ''), '%d-%b-%Y %H:%M:%S') if record.get('exchFeedTime') else None
-                exch_trade_time = datetime.strptime(record.get('exchTradeTime', ''), '%d-%b-%Y %H:%M:%S') if record.get('exchTradeTime') else None
-                
-                # Insert into database
-                self.db_manager.conn.execute("""
-                    INSERT INTO realtime_market_data (
-                        exchange, trading_symbol, symbol_token, ltp, open, high, low, close,
-                        last_trade_qty, exch_feed_time, exch_trade_time, net_change, percent_change,
-                        avg_price, trade_volume, opn_interest, lower_circuit, upper_circuit,
-                        tot_buy_quan, tot_sell_quan, week_low_52, week_high_52, depth_json
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ON CONFLICT (symbol_token, timestamp) DO UPDATE SET
-                        ltp = excluded.ltp,
-                        open = excluded.open,
-                        high = excluded.high,
-                        low = excluded.low,
-                        close = excluded.close,
-                        last_trade_qty = excluded.last_trade_qty,
-                        net_change = excluded.net_change,
-                        percent_change = excluded.percent_change,
-                        avg_price = excluded.avg_price,
-                        trade_volume = excluded.trade_volume,
-                        opn_interest = excluded.opn_interest,
-                        depth_json = excluded.depth_json
-                """, (
-                    record.get('exchange'),
-                    record.get('tradingSymbol'),
-                    record.get('symbolToken'),
-                    record.get('ltp'),
-                    record.get('open'),
-                    record.get('high'),
-                    record.get('low'),
-                    record.get('close'),
-                    record.get('lastTradeQty'),
-                    exch_feed_time,
-                    exch_trade_time,
-                    record.get('netChange'),
-                    record.get('percentChange'),
-                    record.get('avgPrice'),
-                    record.get('tradeVolume'),
-                    record.get('opnInterest'),
-                    record.get('lowerCircuit'),
-                    record.get('upperCircuit'),
-                    record.get('totBuyQuan'),
-                    record.get('totSellQuan'),
-                    record.get('52WeekLow'),
-                    record.get('52WeekHigh'),
-                    depth_json
-                ))
+            # Gather each column once; missing fields become nulls
+            columns = {
+                column: [record.get(field) for record in market_data]
+                for field, column in _REALTIME_COLUMNS.items()
+            }
+            
+            # Parse timestamps in one vectorized pass per column
+            for column in ('exch_feed_time', 'exch_trade_time'):
+                columns[column] = pd.to_datetime(columns[column], format=_EXCHANGE_TIME_FORMAT, errors='coerce')
+            
+            # Convert depth to JSON string
+            columns['depth_json'] = [_dump_json(record.get('depth') or {}) for record in market_data]
+            
+            # Coerce quote values one column at a time, so a malformed value
+            # becomes NULL instead of failing the whole batch
+            for field in _REALTIME_SCHEMA:
+                values = columns[field.name]
+                if pa.types.is_floating(field.type):
+                    coerced = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+                    malformed = int((coerced.isna() & pd.Series(values, dtype=object).notna()).sum())
+                    if malformed:
+                        logger.warning(f"⚠️ Stored {malformed} malformed '{field.name}' values as NULL")
+                    columns[field.name] = coerced
+                elif pa.types.is_string(field.type):
+                    columns[field.name] = [value if value is None or isinstance(value, str) else str(value) for value in values]
+            
+            # Typed Arrow columns are scanned by DuckDB directly, without per-value
+            # Python object conversion or pandas dtype inference
+            batch = pa.Table.from_arrays(
+                [pa.array(columns[field.name], type=field.type, from_pandas=True) for field in _REALTIME_SCHEMA],
+                schema=_REALTIME_SCHEMA
+            )
+            
+            # Insert the batch with a single statement
+            conn = self.db_manager.conn
+            conn.register('realtime_batch', batch)
+            try:
+                conn.execute("INSERT INTO realtime_market_data BY NAME SELECT * FROM realtime_batch")
+            finally:
+                conn.unregister('realtime_batch')
             
             logger.info(f"Successfully stored {len(market_data)} real-time market data records")
             return True
@@ -363,22 +441,25 @@ class RealtimeMarketDataManager:
         # Direct lookup approach using futures data only
         if self.db_manager:
             try:
-                # Query each token individually (more reliable)
-                for data in futures_data:
-                    if 'symbolToken' in data and 'ltp' in data:
-                        symbol_token = data['symbolToken']
-                        ltp = data['ltp']
-                        
-                        # Query token_master for this token
-                        query = """
-                            SELECT name FROM token_master
-                            WHERE token = ? AND token_type = 'FUTURES'
-                        """
-                        result = self.db_manager.conn.execute(query, [symbol_token]).fetchone()
-                        if result:
-                            name = result[0]
-                            futures_prices[name] = ltp
-                            logger.debug(f"Found name {name} for token {symbol_token} with price {ltp}")
+                # Resolve all futures tokens to underlying names with a single query
+                ltp_by_token = {
+                    data['symbolToken']: data['ltp']
+                    for data in futures_data
+                    if 'symbolToken' in data and 'ltp' in data
+                }
+                query = """
+                    SELECT token, name FROM token_master
+                    WHERE token_type = 'FUTURES' AND list_contains(?, token)
+                """
+                rows = self.db_manager.conn.execute(query, [list(ltp_by_token)]).fetchall()
+                name_by_token = dict(rows)
+                
+                # Walk futures_data in order so the last contract per name wins, as before
+                for symbol_token, ltp in ltp_by_token.items():
+                    name = name_by_token.get(symbol_token)
+                    if name is not None:
+                        futures_prices[name] = ltp
+                        logger.debug("Found name %s for token %s with price %s", name, symbol_token, ltp)
                 
                 logger.info(f"Direct lookup: Extracted futures prices for {len(futures_prices)} symbols")
                 
@@ -391,7 +472,7 @@ class RealtimeMarketDataManager:
             
         logger.info(f"Total futures prices available: {len(futures_prices)}")
         for name, price in list(futures_prices.items())[:5]:  # Show first 5 for debugging
-            logger.debug(f"Futures price for {name}: {price}")
+            logger.debug("Futures price for %s: %s", name, price)
         
         # Ensure the options dataframe has the correct columns
         required_columns = ['name', 'strike', 'strike_distance']
@@ -411,86 +492,36 @@ class RealtimeMarketDataManager:
             # For exact ATM, we'll find the closest strike per underlying and option type
             logger.info("Using exact ATM mode - selecting only the closest strike per underlying")
             
-            # First, group options by name and option type (CE/PE)
-            all_options['option_type'] = all_options['symbol'].str.extract(r'(CE|PE)$')
-            
-            # Create an empty dataframe to store the results
-            atm_options = pd.DataFrame()
+            # Distance to the futures price for every option with a known underlying price
+            all_options['option_type'] = all_options['symbol'].str.extract(r'(CE|PE)$', expand=False)
+            all_options['atm_distance'] = (all_options['strike'] - all_options['name'].map(futures_prices)).abs()
+            priced = all_options.dropna(subset=['atm_distance'])
             
-            # For each underlying name and option type
-            for name, name_group in all_options.groupby('name'):
-                if name not in futures_prices:
-                    continue
-                    
-                future_price = futures_prices[name]
-                
-                # Get strike distance for this name
-                strike_distance = name_group['strike_distance'].iloc[0]
-                if pd.isna(strike_distance):
-                    # Use default values
-                    if name == 'NIFTY':
-                        strike_distance = 50
-                    elif name == 'BANKNIFTY':
-                        strike_distance = 100
-                    else:
-                        strike_distance = 5
-                
-                # For each option type (CE/PE), find the closest strike
-                for option_type, type_group in name_group.groupby('option_type'):
-                    # Calculate distance to ATM for each strike
-                    type_group['atm_distance'] = abs(type_group['strike'] - future_price)
-                    
-                    # Get the row with minimum distance
-                    closest_strike = type_group.loc[type_group['atm_distance'].idxmin()]
-                    
-                    # Add to results
-                    atm_options = pd.concat([atm_options, pd.DataFrame([closest_strike])])
+            # Keep the closest strike per underlying name and option type (CE/PE)
+            closest = priced.groupby(['name', 'option_type'])['atm_distance'].idxmin()
+            atm_options = priced.loc[closest.values]
             
             logger.info(f"Selected {len(atm_options)} exact ATM options (1 call + 1 put per underlying)")
             return atm_options
         else:
-            # Function to determine if an option is ATM or near-ATM
-            def is_near_atm(row):
-                try:
-                    name = row['name']
-                    if pd.isna(name) or name not in futures_prices:
-                        return False
-                    
-                    strike = row['strike']
-                    if pd.isna(strike):
-                        return False
-                        
-                    future_price = futures_prices[name]
-                    strike_distance = row.get('strike_distance')
-                    
-                    # If strike_distance is not available, use a default value
-                    if not strike_distance or pd.isna(strike_distance):
-                        # Use common values based on index or stock
-                        if name == 'NIFTY':
-                            strike_distance = 50
-                        elif name == 'BANKNIFTY':
-                            strike_distance = 100
-                        else:
-                            strike_distance = 5  # Default for stocks
-                    
-                    # Calculate how many strike distances away from ATM
-                    strikes_away = abs(future_price - strike) / strike_distance
-                    
-                    # Return True if within buffer range
-                    return strikes_away <= strike_buffer
-                except Exception as e:
-                    logger.debug(f"Error in is_near_atm for row {row.get('name', 'unknown')}: {str(e)}")
-                    return False
-            
             try:
-                # Filter options to only include ATM and near-ATM
-                atm_options = all_options[all_options.apply(is_near_atm, axis=1)]
+                # Filter options to only include ATM and near-ATM, using column operations
+                future_price = all_options['name'].map(futures_prices)
+                
+                # Fall back to common strike distances where the token master has none
+                default_distance = all_options['name'].map({'NIFTY': 50, 'BANKNIFTY': 100}).fillna(5)
+                strike_distance = all_options['strike_distance']
+                strike_distance = strike_distance.where(strike_distance.notna() & (strike_distance != 0), default_distance)
+                
+                # Number of strike distances away from ATM; rows without a price or strike compare False
+                strikes_away = (future_price - all_options['strike']).abs() / strike_distance
+                atm_options = all_options[strikes_away <= strike_buffer]
                 
                 logger.info(f"Filtered from {len(all_options)} to {len(atm_options)} ATM options (buffer={strike_buffer})")
                 return atm_options
             except Exception as e:
                 logger.error(f"Error filtering ATM options: {str(e)}")
-                if not all_options.empty:
+                if not all_options.empty and logger.isEnabledFor(logging.DEBUG):
                     logger.debug(f"First few rows of all_options: {all_options.head().to_dict()}")
                 return pd.DataFrame()
 
@@ -531,6 +562,10 @@ class RealtimeMarketDataManager:
             'errors': []
         }
         
+        if not (include_equity or include_futures or include_options):
+            logger.warning("No instrument types selected")
+            return results
+        
         try:
             # First pass: Process equity and futures to get prices
             futures_data = []
@@ -548,28 +583,26 @@ class RealtimeMarketDataManager:
                     futures_batches = self.batch_tokens(futures_exchange_tokens)
                     logger.info(f"Split futures tokens into {len(futures_batches)} batches")
                     
+                    # Fetch all batches concurrently
+                    responses = self.fetch_realtime_market_data_batches(futures_batches)
+                    
                     # Process each batch
-                    for i, batch in enumerate(futures_batches):
-                        logger.info(f"Processing futures batch {i+1}/{len(futures_batches)}")
-                        
-                        # Fetch real-time data
-                        response = self.fetch_realtime_market_data(batch)
-                        
+                    for i, response in enumerate(responses):
                         if response:
                             # Process response
                             fetched, unfetched = self.process_market_data_response(response)
                             
                             # Store futures data for ATM calculation
                             futures_data.extend(fetched)
-                            logger.info(f"Batch {i+1}: Added {len(fetched)} futures records to ATM calculation data")
-                            
-                            # Store fetched data
-                            if fetched:
-                                if self.store_realtime_market_data(fetched):
-                                    results['success'] += len(fetched)
-                                    results['futures'] += len(fetched)
+                            logger.debug("Batch %d: Added %d futures records to ATM calculation data", i + 1, len(fetched))
                         else:
                             logger.warning(f"No response for futures batch {i+1}")
+                    
+                    # Store fetched data with a single insert
+                    if futures_data:
+                        if self.store_realtime_market_data(futures_data):
+                            results['success'] += len(futures_data)
+                            results['futures'] += len(futures_data)
                 else:
                     logger.warning("No futures tokens found in database")
             
@@ -586,12 +619,11 @@ class RealtimeMarketDataManager:
                 if 'ltp' in sample:
                     logger.debug(f"Sample price: {sample['ltp']}")
             
-            # Collect tokens
-            all_tokens = pd.DataFrame()
+            # Collect token frames, concatenated once below
+            token_frames = []
             
             if include_equity:
-                equity_tokens = self.get_equity_tokens(equity_limit)
-                all_tokens = pd.concat([all_tokens, equity_tokens])
+                token_frames.append(self.get_equity_tokens(equity_limit))
             
             # Second pass: Handle options (ATM only if specified) and any remaining equity
             if include_options:
@@ -612,7 +644,10 @@ class RealtimeMarketDataManager:
                     options_tokens = self.get_options_tokens(options_limit)
                     logger.info(f"Retrieved all {len(options_tokens)} options tokens (not filtered for ATM)")
                 
-                all_tokens = pd.concat([all_tokens, options_tokens])
+                token_frames.append(options_tokens)
+            
+            token_frames = [frame for frame in token_frames if not frame.empty]
+            all_tokens = pd.concat(token_frames, ignore_index=True) if token_frames else pd.DataFrame()
             
             # Skip futures since we've already processed them
             # This also prevents processing futures tokens twice
@@ -628,31 +663,33 @@ class RealtimeMarketDataManager:
                 # Split into batches
                 batches = self.batch_tokens(exchange_tokens)
                 
+                # Fetch all batches concurrently
+                responses = self.fetch_realtime_market_data_batches(batches)
+                
                 # Process each batch
-                for i, batch in enumerate(batches):
-                    logger.info(f"Processing batch {i+1}/{len(batches)}")
-                    
-                    # Fetch real-time data
-                    response = self.fetch_realtime_market_data(batch)
-                    
+                fetched_data = []
+                for i, response in enumerate(responses):
                     if response:
                         # Process response
                         fetched, unfetched = self.process_market_data_response(response)
+                        fetched_data.extend(fetched)
+                    else:
+                        logger.warning(f"No response for batch {i+1}")
+                
+                # Store fetched data with a single insert
+                if fetched_data:
+                    if self.store_realtime_market_data(fetched_data):
+                        results['success'] += len(fetched_data)
                         
-                        # Store fetched data
-                        if fetched:
-                            if self.store_realtime_market_data(fetched):
-                                results['success'] += len(fetched)
-                                
-                                # Count by instrument type
-                                for item in fetched:
-                                    symbol = item.get('tradingSymbol', '')
-                                    if 'FUT' in symbol:
-                                        results['futures'] += 1
-                                    elif 'CE' in symbol or 'PE' in symbol:
-                                        results['options'] += 1
-                                    else:
-                                        results['equity'] += 1
+                        # Count by instrument type
+                        for item in fetched_data:
+                            symbol = item.get('tradingSymbol', '')
+                            if 'FUT' in symbol:
+                                results['futures'] += 1
+                            elif 'CE' in symbol or 'PE' in symbol:
+                                results['options'] += 1
+                            else:
+                                results['equity'] += 1
             
             results['total'] = results['success'] + results['failures']
             return results
@@ -88,15 +88,15 @@ class TechnicalIndicatorManager:
             # Calculate how many periods to fetch using the multiplier from config
             fetch_periods = int(period * self.config['max_fetch_multiplier'])
             
-            query = f"""
+            query = """
                 SELECT token, symbol_name, timestamp, open, high, low, close, volume
                 FROM historical_data
-                WHERE token = '{token}'
+                WHERE token = ?
                 ORDER BY timestamp DESC
-                LIMIT {fetch_periods}
+                LIMIT ?
             """
             
-            data = self.db_manager.conn.execute(query).fetchdf()
+            data = self.db_manager.conn.execute(query, [token, fetch_periods]).fetchdf()
             
             if len(data) < period:
                 logger.warning(f"⚠️ Not enough historical data for {symbol} ({token}). "
@@ -205,33 +205,33 @@ class TechnicalIndicatorManager:
                 logger.warning(f"⚠️ No valid {indicator_name} values for {symbol} ({token}) after filtering NaNs")
                 return False
                 
-            # Create records for insertion
-            records = []
-            for _, row in valid_data.iterrows():
-                records.append({
-                    'token': token,
-                    'symbol_name': symbol,
-                    'indicator_name': indicator_name,
-                    'timestamp': row['timestamp'],
-                    'value': row[column_name],
-                    'period': period
-                })
-                
-            # Convert to dataframe for insertion
-            df = pd.DataFrame(records)
-            
-            # Insert with conflict resolution
-            self.db_manager.conn.execute("""
-                INSERT INTO technical_indicators
-                (token, symbol_name, indicator_name, timestamp, value, period)
-                SELECT token, symbol_name, indicator_name, timestamp, value, period
-                FROM df
-                ON CONFLICT(token, indicator_name, period, timestamp) DO UPDATE SET
-                    symbol_name = EXCLUDED.symbol_name,
-                    value = EXCLUDED.value
-            """)
-            
-            logger.info(f"✅ Successfully stored {len(records)} {indicator_name}_{period} values for {symbol} ({token})")
+            # Build the insert frame column-wise, scalars are broadcast to every row
+            df = pd.DataFrame({
+                'token': token,
+                'symbol_name': symbol,
+                'indicator_name': indicator_name,
+                'timestamp': valid_data['timestamp'].to_numpy(),
+                'value': valid_data[column_name].to_numpy(),
+                'period': period
+            })
+            
+            # Insert with conflict resolution; the frame is registered explicitly
+            # instead of relying on DuckDB's scan of Python locals
+            self.db_manager.conn.register('indicator_batch', df)
+            try:
+                self.db_manager.conn.execute("""
+                    INSERT INTO technical_indicators
+                    (token, symbol_name, indicator_name, timestamp, value, period)
+                    SELECT token, symbol_name, indicator_name, timestamp, value, period
+                    FROM indicator_batch
+                    ON CONFLICT(token, indicator_name, period, timestamp) DO UPDATE SET
+                        symbol_name = EXCLUDED.symbol_name,
+                        value = EXCLUDED.value
+                """)
+            finally:
+                self.db_manager.conn.unregister('indicator_batch')
+            
+            logger.info(f"✅ Successfully stored {len(df)} {indicator_name}_{period} values for {symbol} ({token})")
             return True
             
         except Exception as e:
@@ -318,10 +318,12 @@ class TechnicalIndicatorManager:
                 WHERE token_type = 'EQUITY'
             """
             
+            params = []
             if limit:
-                query += f" LIMIT {limit}"
+                query += " LIMIT ?"
+                params.append(limit)
                 
-            tokens = self.db_manager.conn.execute(query).fetchdf()
+            tokens = self.db_manager.conn.execute(query, params).fetchdf()
             
             if tokens.empty:
                 logger.warning("No equity tokens found in database")
@@ -346,10 +348,7 @@ class TechnicalIndicatorManager:
                 logger.info(f"Processing batch {i//batch_size + 1}/{(len(tokens)+batch_size-1)//batch_size}")
                 
                 # Process each token in the batch
-                for _, row in batch.iterrows():
-                    token = row['token']
-                    symbol = row['name']
-                    
+                for token, symbol in batch[['token', 'name']].itertuples(index=False, name=None):
                     logger.info(f"Processing {indicator_name}({period}) for {symbol} ({token})")
                     
                     # Calculate and store indicator
@@ -459,17 +458,17 @@ class TechnicalIndicatorManager:
             if period is None:
                 period = self.config['default_period']
                 
-            query = f"""
+            query = """
                 SELECT value
                 FROM technical_indicators
-                WHERE token = '{token}'
-                  AND indicator_name = '{indicator_name}'
-                  AND period = {period}
+                WHERE token = ?
+                  AND indicator_name = ?
+                  AND period = ?
                 ORDER BY timestamp DESC
                 LIMIT 1
             """
             
-            result = self.db_manager.conn.execute(query).fetchone()
+            result = self.db_manager.conn.execute(query, [token, indicator_name, period]).fetchone()
             
             if result and result[0] is not None:
                 return float(result[0])
@@ -503,10 +502,12 @@ class TechnicalIndicatorManager:
                 WHERE token_type = 'EQUITY'
             """
             
+            params = []
             if limit:
-                query += f" LIMIT {limit}"
+                query += " LIMIT ?"
+                params.append(limit)
                 
-            tokens = self.db_manager.conn.execute(query).fetchdf()
+            tokens = self.db_manager.conn.execute(query, params).fetchdf()
             
             if tokens.empty:
                 logger.warning("No equity tokens found in database")
@@ -526,20 +527,17 @@ class TechnicalIndicatorManager:
             all_summary_records = []
             
             # Process each token
-            for _, row in tokens.iterrows():
-                token = row['token']
-                symbol = row['name']
-                
+            for token, symbol in tokens[['token', 'name']].itertuples(index=False, name=None):
                 try:
                     # Get the latest trade date and closing price
-                    latest_data_query = f"""
+                    latest_data_query = """
                         SELECT timestamp::DATE AS trade_date, close, volume
                         FROM historical_data
-                        WHERE token = '{token}'
+                        WHERE token = ?
                         ORDER BY timestamp DESC
                         LIMIT 1
                     """
-                    latest_data = self.db_manager.conn.execute(latest_data_query).fetchone()
+                    latest_data = self.db_manager.conn.execute(latest_data_query, [token]).fetchone()
                     
                     if not latest_data:
                         logger.warning(f"No historical data found for {symbol} ({token})")
@@ -565,18 +563,20 @@ class TechnicalIndicatorManager:
                             column_name = f"{indicator_name}_{period}"
                             
                             # Get the latest value for this indicator
-                            latest_indicator_query = f"""
+                            latest_indicator_query = """
                                 SELECT value
                                 FROM technical_indicators
-                                WHERE token = '{token}'
-                                  AND indicator_name = '{indicator_name}'
-                                  AND period = {period}
-                                  AND timestamp::DATE = '{trade_date}'
+                                WHERE token = ?
+                                  AND indicator_name = ?
+                                  AND period = ?
+                                  AND timestamp::DATE = ?
                                 ORDER BY timestamp DESC
                                 LIMIT 1
                             """
                             
-                            latest_indicator = self.db_manager.conn.execute(latest_indicator_query).fetchone()
+                            latest_indicator = self.db_manager.conn.execute(
+                                latest_indicator_query, [token, indicator_name, period, trade_date]
+                            ).fetchone()
                             
                             if latest_indicator and latest_indicator[0] is not None:
                                 summary_data[column_name] = float(latest_indicator[0])
@@ -594,20 +594,21 @@ class TechnicalIndicatorManager:
             if all_summary_records:
                 summary_df = pd.DataFrame(all_summary_records)
                 
-                # First, delete existing records for these tokens 
-                tokens_list = "', '".join([record['token'] for record in all_summary_records])
-                self.db_manager.conn.execute(f"DELETE FROM technical_indicators_summary WHERE token IN ('{tokens_list}')")
-                
-                # Now insert the new records with explicit column names
-                # This avoids the mismatch with the DEFAULT CURRENT_TIMESTAMP column
+                # Replace existing records for these tokens in a single atomic statement
+                # (DuckDB rejects DELETE + re-INSERT of the same keys in one transaction).
+                # Explicit column names avoid the mismatch with the update_timestamp column
                 columns = ", ".join(summary_df.columns)
-                self.db_manager.conn.execute(f"""
-                    INSERT INTO technical_indicators_summary
-                    (token, symbol_name, trade_date, sma_50, sma_100, sma_200, 
-                     ema_20, ema_50, ema_200, rsi_14, rsi_21, 
-                     volatility_21, volatility_200, last_close, last_volume)
-                    SELECT {columns} FROM summary_df
-                """)
+                self.db_manager.conn.register('summary_batch', summary_df)
+                try:
+                    self.db_manager.conn.execute(f"""
+                        INSERT OR REPLACE INTO technical_indicators_summary
+                        (token, symbol_name, trade_date, sma_50, sma_100, sma_200, 
+                         ema_20, ema_50, ema_200, rsi_14, rsi_21, 
+                         volatility_21, volatility_200, last_close, last_volume, update_timestamp)
+                        SELECT {columns}, CURRENT_TIMESTAMP FROM summary_batch
+                    """)
+                finally:
+                    self.db_manager.conn.unregister('summary_batch')
                 
                 logger.info(f"Updated technical indicators summary for {len(all_summary_records)} stocks")
             
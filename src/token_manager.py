@@ -4,6 +4,7 @@ Handles fetching and processing of token master data.
 """
 
 import json
+import logging
 import requests
 import pandas as pd
 from datetime import datetime, time
@@ -117,7 +118,6 @@ class TokenManager:
             futures_type = config.get('instrument_types', 'futures_stock')
             nfo_segment = config.get('exchange_segments', 'nfo')
             expiry_format = config.get('date_formats', 'expiry')
-            db_date_format = config.get('date_formats', 'db_date')
             
             # Filter futures stocks
             futures_df = self.tokens_df[
@@ -135,11 +135,12 @@ class TokenManager:
             for expiry in sorted(distinct_expiry_formats):
                 logger.info(f"Expiry format: {expiry}")
             
-            # Convert expiry strings to dates
+            # Convert expiry strings to dates; cache=True parses each distinct string once
             futures_df['expiry_date'] = pd.to_datetime(
                 futures_df['expiry'], 
-                format=expiry_format
-            ).dt.date
+                format=expiry_format,
+                cache=True
+            )
             
             # Find minimum expiry and filter
             min_expiry = futures_df['expiry_date'].min()
@@ -147,10 +148,8 @@ class TokenManager:
                 futures_df['expiry_date'] == min_expiry
             ].copy()
             
-            # Convert expiry to standard format
-            current_expiry_futures['expiry'] = current_expiry_futures['expiry_date'].apply(
-                lambda x: x.strftime(db_date_format)
-            )
+            # Keep expiry typed so it is stored as DATE without string parsing
+            current_expiry_futures['expiry'] = current_expiry_futures['expiry_date']
             
             # Add token type and futures token reference
             current_expiry_futures['token_type'] = config.get('token_types', 'futures')
@@ -187,7 +186,6 @@ class TokenManager:
             options_type = config.get('instrument_types', 'options_stock')
             nfo_segment = config.get('exchange_segments', 'nfo')
             expiry_format = config.get('date_formats', 'expiry')
-            db_date_format = config.get('date_formats', 'db_date')
             
             # Filter options stocks
             options_df = self.tokens_df[
@@ -205,11 +203,12 @@ class TokenManager:
             for expiry in sorted(distinct_expiry_formats):
                 logger.info(f"Expiry format: {expiry}")
             
-            # Convert expiry strings to dates
+            # Convert expiry strings to dates; cache=True parses each distinct string once
             options_df['expiry_date'] = pd.to_datetime(
                 options_df['expiry'], 
-                format=expiry_format
-            ).dt.date
+                format=expiry_format,
+                cache=True
+            )
             
             # Find minimum expiry and filter
             min_expiry = options_df['expiry_date'].min()
@@ -217,10 +216,8 @@ class TokenManager:
                 options_df['expiry_date'] == min_expiry
             ].copy()
             
-            # Convert expiry to standard format
-            current_expiry_options['expiry'] = current_expiry_options['expiry_date'].apply(
-                lambda x: x.strftime(db_date_format)
-            )
+            # Keep expiry typed so it is stored as DATE without string parsing
+            current_expiry_options['expiry'] = current_expiry_options['expiry_date']
             
             # Add token type and futures token reference
             current_expiry_options['token_type'] = config.get('token_types', 'options')
@@ -253,18 +250,20 @@ class TokenManager:
             # Add strike_distance to dataframe
             current_expiry_options['strike_distance'] = current_expiry_options['name'].map(strike_distances)
             
-            # Log strike distances
-            logger.info("\nCalculated strike distances:")
-            strike_distance_df = pd.DataFrame(list(strike_distances.items()), columns=['name', 'strike_distance'])
-            logger.info(strike_distance_df.head())
+            # Log strike distances; the preview frame is only built when INFO is enabled
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("\nCalculated strike distances:")
+                strike_distance_df = pd.DataFrame(list(strike_distances.items()), columns=['name', 'strike_distance'])
+                logger.info(strike_distance_df.head())
             
             # Drop temporary column
             current_expiry_options.drop('expiry_date', axis=1, inplace=True)
             
             # Log some statistics about the options
             logger.info(f"✅ Found {len(current_expiry_options)} current expiry options")
-            logger.info("\nOptions strike price distribution:")
-            logger.info(current_expiry_options.groupby('name')['strike'].agg(['count', 'min', 'max']).head())
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("\nOptions strike price distribution:")
+                logger.info(current_expiry_options.groupby('name')['strike'].agg(['count', 'min', 'max']).head())
             
             return current_expiry_options
             
@@ -366,11 +365,8 @@ class TokenManager:
             if equity_df is None:
                 return False
             
-            # Combine DataFrames
-            combined_df = pd.concat([futures_df, options_df, equity_df], ignore_index=True)
-            
-            # Store in database
-            return self.db_manager.store_tokens(combined_df)
+            # Store in database; frames are combined during the insert
+            return self.db_manager.store_tokens(futures_df, options_df, equity_df)
             
         except Exception as e:
             logger.error(f"❌ Error in token processing pipeline: {str(e)}")
@@ -52,9 +52,9 @@ def export_market_summary_to_parquet(output_path=None, sql_file=None):
             
             logger.info("Executing SQL query directly...")
             
-            # Execute SQL query directly
+            # Bind the query first so malformed SQL can be fixed before exporting
             try:
-                result = db_manager.conn.execute(sql).fetchdf()
+                db_manager.conn.execute(f"DESCRIBE {sql}")
             except Exception as sql_error:
                 logger.error(f"Error executing SQL query: {str(sql_error)}")
                 logger.info("Attempting to fix common SQL issues...")
@@ -67,29 +67,16 @@ def export_market_summary_to_parquet(output_path=None, sql_file=None):
                     
                 # Try again with fixed SQL
                 try:
-                    result = db_manager.conn.execute(fixed_sql).fetchdf()
+                    db_manager.conn.execute(f"DESCRIBE {fixed_sql}")
+                    sql = fixed_sql
                     logger.info("Successfully executed SQL with automatic fixes")
                 except Exception as retry_error:
                     logger.error(f"Failed to execute SQL even after fixing: {str(retry_error)}")
                     return False
             
-            if result.empty:
-                logger.warning("The query returned no results")
-                return False
-                
-            # Create exports directory if it doesn't exist
-            os.makedirs("exports", exist_ok=True)
-            
-            # Save to Parquet file
-            if output_path:
-                parquet_file = output_path
-            else:
-                parquet_file = os.path.join("exports", "market_summary.parquet")
-                
-            result.to_parquet(parquet_file, index=False)
-            
-            logger.info(f"✅ Successfully exported {len(result)} records to {parquet_file}")
-            return True
+            # Export through DBManager so the query gets the same column casts
+            # and atomic file replacement as the view export
+            return db_manager.export_market_summary_to_parquet(output_path=output_path, query=sql)
         else:
             # Use the DBManager's built-in export function
             return db_manager.export_market_summary_to_parquet(output_path=output_path)